@@ -1,49 +1,183 @@
 #!/usr/bin/env python3
 import os
 import io
+import mimetypes
+import atexit
+import gzip
+import hashlib
+import json
 import secrets
+import shutil
 import pathlib
 import sqlite3
-from datetime import datetime
-from typing import Iterable
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import closing, contextmanager
+from functools import lru_cache, partial
+from datetime import datetime, timezone
+from typing import IO, Iterable, NamedTuple, Optional
+from urllib.parse import quote
 
 from flask import (
-    Flask, request, redirect, url_for, send_from_directory, abort,
-    render_template_string, flash, jsonify, make_response
+    Flask, Response, request, redirect, url_for, send_from_directory, abort,
+    flash, make_response, session, stream_with_context
 )
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
 from PIL import Image, ExifTags
-import qrcode
-from jinja2 import ChoiceLoader, DictLoader
+import segno
+from jinja2 import ChoiceLoader, DictLoader, FileSystemBytecodeCache
+from markupsafe import Markup, escape
+
+try:
+    import brotli  # optional, sonst nur gzip
+except ImportError:
+    brotli = None
+
+try:
+    # optional, sonst parst Werkzeug die Uploads
+    from streaming_form_data import StreamingFormDataParser
+    from streaming_form_data.targets import BaseTarget, ValueTarget
+except ImportError:
+    StreamingFormDataParser = None
+
+try:
+    import orjson  # optional, sonst stdlib json
+except ImportError:
+    orjson = None
+
+try:
+    import pyvips  # optional, sonst erzeugt Pillow die Thumbnails
+except (ImportError, OSError):  # OSError: libvips selbst fehlt
+    pyvips = None
 
 # -------------------- Konfiguration --------------------
 BASE_DIR = pathlib.Path(__file__).resolve().parent
 UPLOAD_DIR = pathlib.Path(os.getenv("UPLOAD_DIR", BASE_DIR / "uploads"))
 THUMB_DIR = UPLOAD_DIR / "thumbs"
+STATIC_DIR = BASE_DIR / "app" / "static"
+# Im Projektordner wie beim Paket: ein gemeinsames /tmp-Verzeichnis könnte ein anderer
+# Benutzer anlegen und darüber fremden Bytecode einschleusen
+JINJA_CACHE_DIR = pathlib.Path(os.getenv("JINJA_CACHE_DIR", BASE_DIR / ".jinja_cache"))
 DB_PATH = pathlib.Path(os.getenv("DB_PATH", BASE_DIR / "uploads.db"))
 
-ALLOWED_EXT = {"jpg", "jpeg", "png", "gif", "webp"}
+ALLOWED_EXT = frozenset({"jpg", "jpeg", "png", "gif", "webp"})
 MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH_MB", "32")) * 1024 * 1024
 PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL")  # z.B. https://fotos.deine-hochzeit.de
 UPLOAD_CODE = os.getenv("UPLOAD_CODE")          # optionaler Code fürs Upload-Formular
-ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", secrets.token_urlsafe(16))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") or secrets.token_urlsafe(16)  # leer zählt als nicht gesetzt
 THUMB_SIZE = int(os.getenv("THUMB_SIZE", "640"))  # Kantenlänge Thumbnail
+WEBP_QUALITY = int(os.getenv("WEBP_QUALITY", "82"))  # Thumbnail-Qualität 0-100
+WEBP_METHOD = int(os.getenv("WEBP_METHOD", "4"))  # libwebp-Aufwand 0-6, 6 ist ~3x langsamer
+GALLERY_PAGE_SIZE = int(os.getenv("GALLERY_PAGE_SIZE", "60"))  # Fotos pro Galerieseite
 TITLE = os.getenv("TITLE", "Hochzeitsfotos hochladen")
+USE_X_SENDFILE = os.getenv("USE_X_SENDFILE", "0") == "1"  # Apache mod_xsendfile
+X_ACCEL_UPLOADS = os.getenv("X_ACCEL_UPLOADS")  # nginx internal location, z.B. /_internal_uploads/
 
-app = Flask(__name__)
-app.secret_key = os.getenv("FLASK_SECRET", secrets.token_urlsafe(16))
+app = Flask(__name__, static_folder=STATIC_DIR)
+app.secret_key = os.getenv("FLASK_SECRET") or secrets.token_urlsafe(16)
 app.config["MAX_CONTENT_LENGTH"] = MAX_CONTENT_LENGTH
+app.config["USE_X_SENDFILE"] = USE_X_SENDFILE
 
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 THUMB_DIR.mkdir(parents=True, exist_ok=True)
+JINJA_CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+# Thumbnails entstehen im Hintergrund, die Upload-Antwort wartet nicht darauf
+def _new_thumb_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="thumb")
+
+THUMB_POOL = _new_thumb_pool()
+
+def _reset_thumb_pool():
+    # Threads überleben fork() nicht: jeder Worker eines vorladenden Servers
+    # (gunicorn --preload) braucht einen eigenen Pool
+    global THUMB_POOL
+    THUMB_POOL = _new_thumb_pool()
+
+os.register_at_fork(after_in_child=_reset_thumb_pool)
 
 # -------------------- DB --------------------
-def db():
-    con = sqlite3.connect(DB_PATH)
-    con.row_factory = sqlite3.Row
+# Gelten nur pro Verbindung und müssen daher bei jedem connect gesetzt werden
+CONNECTION_PRAGMAS = (
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=134217728",
+)
+
+_db_local = threading.local()
+_db_connections = []
+_db_connections_lock = threading.Lock()
+
+def _connection() -> sqlite3.Connection:
+    """Liefert die Verbindung des aktuellen Threads und legt sie beim ersten Zugriff an."""
+    con = getattr(_db_local, "con", None)
+    if con is None:
+        con = sqlite3.connect(DB_PATH, isolation_level=None, check_same_thread=False)
+        con.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            con.execute(pragma)
+        _db_local.con = con
+        with _db_connections_lock:
+            _db_connections.append(con)
     return con
 
+@contextmanager
+def db():
+    con = _connection()
+    try:
+        yield con
+    except Exception:
+        if con.in_transaction:
+            con.rollback()
+        raise
+    else:
+        if con.in_transaction:
+            con.commit()
+
+def gallery_where(before: Optional[int]) -> str:
+    # Zwei feste Varianten statt "? IS NULL OR id < ?", das SQLite nicht per Index auflöst
+    return "" if before is None else "WHERE id < ?"
+
+def gallery_params(before: Optional[int], limit: int) -> tuple:
+    return (limit,) if before is None else (before, limit)
+
+def tuple_cursor(con: sqlite3.Connection) -> sqlite3.Cursor:
+    # Für Listen, deren Zeilen ohnehin entpackt werden: einfache Tupel ohne
+    # den Namens-Lookup von sqlite3.Row
+    cur = con.cursor()
+    cur.row_factory = None
+    return cur
+
+@atexit.register
+def _close_db_connections():
+    with _db_connections_lock:
+        while _db_connections:
+            _db_connections.pop().close()
+
+GALLERY_VERSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS gallery_version (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO gallery_version (id, version) VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS media_version_insert AFTER INSERT ON media
+BEGIN UPDATE gallery_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS media_version_update AFTER UPDATE ON media
+BEGIN UPDATE gallery_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS media_version_delete AFTER DELETE ON media
+BEGIN UPDATE gallery_version SET version = version + 1; END;
+"""
+
 def init_db():
+    # WAL ist persistent in der DB-Datei, einmal beim Start setzen reicht
+    if str(DB_PATH) != ":memory:":
+        # closing(): der with-Block einer Connection committet nur, er schließt sie nicht
+        with closing(sqlite3.connect(DB_PATH)) as con:
+            con.execute("PRAGMA journal_mode=WAL")
     with db() as con:
         con.execute("""
         CREATE TABLE IF NOT EXISTS media (
@@ -54,57 +188,346 @@ def init_db():
             created_at TEXT
         )
         """)
+        columns = {row["name"] for row in con.execute("PRAGMA table_info(media)")}
+        if "thumb_hash" not in columns:
+            con.execute("ALTER TABLE media ADD COLUMN thumb_hash TEXT")
+        # Deckt die Galerie-Abfrage komplett ab: kein Tabellenzugriff, kein Sortieren,
+        # und Folgeseiten (id < ?) springen direkt an die richtige Stelle
+        con.execute("""
+        CREATE INDEX IF NOT EXISTS idx_media_cover
+            ON media(id DESC, filename, orig_name, created_at, thumb_hash)
+        """)
+        # Zähler für das Galerie-ETag: jede Änderung an media erhöht ihn, er läuft nie
+        # rückwärts. MAX()/COUNT() können nach Löschen + Upload wieder gleich aussehen.
+        con.executescript(GALLERY_VERSION_SCHEMA)
 init_db()
 
 # -------------------- Utils --------------------
+def _ext(filename: str) -> str:
+    _, sep, tail = filename.rpartition(".")
+    return tail.lower() if sep else ""
+
+def _stem(filename: str) -> str:
+    # Wie pathlib.Path(filename).stem für Namen ohne Verzeichnis, aber ohne Path-Objekt
+    return filename.rpartition(".")[0] or filename
+
 def allowed(filename: str) -> bool:
-    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
-    return ext in ALLOWED_EXT
+    return _ext(filename) in ALLOWED_EXT
+
+ORIENTATION_TAG = next(k for k, v in ExifTags.TAGS.items() if v == "Orientation")
+# transpose() kopiert nur Pixel um, rotate() läuft über die affine Transformation
+ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
 
 def autorotate(img: Image.Image) -> Image.Image:
     try:
         exif = img._getexif()
         if exif:
-            orient_key = next(k for k, v in ExifTags.TAGS.items() if v == "Orientation")
-            orientation = exif.get(orient_key)
-            if orientation == 3:
-                img = img.rotate(180, expand=True)
-            elif orientation == 6:
-                img = img.rotate(270, expand=True)
-            elif orientation == 8:
-                img = img.rotate(90, expand=True)
+            op = ORIENTATION_TRANSPOSE.get(exif.get(ORIENTATION_TAG))
+            if op is not None:
+                img = img.transpose(op)
     except Exception:
         pass
     return img
 
+def _stream_fd(stream) -> Optional[int]:
+    # Kleine Uploads liegen im Speicher; fileno() würde sie erst auf die Platte schreiben
+    if isinstance(stream, tempfile.SpooledTemporaryFile) and not stream._rolled:
+        return None
+    try:
+        return stream.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+def copy_stream(stream: IO[bytes], path: pathlib.Path):
+    """Schreibt den Upload nach path, per sendfile() im Kernel, wenn möglich."""
+    src_fd = _stream_fd(stream) if hasattr(os, "sendfile") else None
+    with open(path, "wb") as dst:
+        if src_fd is not None:
+            offset = stream.tell()
+            size = os.fstat(src_fd).st_size
+            while offset < size:
+                sent = os.sendfile(dst.fileno(), src_fd, offset, size - offset)
+                if not sent:
+                    break
+                offset += sent
+        else:
+            shutil.copyfileobj(stream, dst, length=1 << 20)
+
+def drop_page_cache(path: pathlib.Path):
+    # Das Original wird nach dem Thumbnail kaum noch gelesen; nicht im Page-Cache
+    # halten, damit es keine Thumbnails und DB-Seiten verdrängt
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass  # nur ein Hinweis an den Kernel
+
 def make_thumb(src: pathlib.Path, dst: pathlib.Path):
+    if pyvips is not None:
+        try:
+            # libvips verkleinert schon beim Laden und arbeitet in Kacheln, das Foto
+            # liegt nie vollständig im Speicher; die EXIF-Drehung erledigt thumbnail() selbst
+            im = pyvips.Image.thumbnail(str(src), THUMB_SIZE, height=THUMB_SIZE, size="down")
+            im.write_to_file(str(dst), Q=WEBP_QUALITY, strip=True)
+            return
+        except pyvips.Error:
+            pass  # z.B. kein vips-Loader für das Format: Pillow versuchen
     try:
         with Image.open(src) as im:
+            if im.format == "JPEG":
+                # libjpeg dekodiert direkt in 1/2, 1/4 oder 1/8 Auflösung
+                im.draft("RGB", (THUMB_SIZE * 2, THUMB_SIZE * 2))
             im = autorotate(im)
-            im.thumbnail((THUMB_SIZE, THUMB_SIZE))
-            im.save(dst, "WEBP", quality=85, method=6)
+            # LANCZOS explizit: Pillow-SIMD beschleunigt nur die Filter-Resampler, nicht NEAREST
+            im.thumbnail((THUMB_SIZE, THUMB_SIZE), Image.Resampling.LANCZOS)
+            if im.mode == "RGBA" and im.getchannel("A").getextrema() == (255, 255):
+                im = im.convert("RGB")  # deckender Alphakanal: ohne ihn kodiert libwebp schneller
+            # method=4 statt 6: bei 640px kaum größer, aber etwa 3x schneller kodiert
+            im.save(dst, "WEBP", quality=WEBP_QUALITY, method=WEBP_METHOD, lossless=False, exact=False)
     except Exception:
-        dst.write_bytes(src.read_bytes())
+        # Original als Vorschau: Hardlink ohne I/O, sonst Kopie im Kernel (copy_file_range/sendfile)
+        dst.unlink(missing_ok=True)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copyfile(src, dst)
+
+def hash_thumb(name: str, thumb: pathlib.Path) -> Optional[str]:
+    # Zusätzlicher Hardlink unter dem Inhalts-Hash: diese URL ändert sich nie und
+    # darf als immutable gecacht werden
+    thumb_hash = hashlib.blake2b(thumb.read_bytes(), digest_size=8).hexdigest()
+    try:
+        os.link(thumb, THUMB_DIR / f"{thumb_hash}.webp")
+    except FileExistsError:
+        pass  # gleicher Inhalt wurde schon einmal hochgeladen
+    with db() as con:
+        updated = con.execute(
+            "UPDATE media SET thumb_hash = ? WHERE filename = ?", (thumb_hash, name)
+        ).rowcount
+        shared = updated or con.execute(
+            "SELECT 1 FROM media WHERE thumb_hash = ? LIMIT 1", (thumb_hash,)
+        ).fetchone()
+    if not updated:
+        # Foto wurde während des Renderns gelöscht: keine verwaisten Dateien zurücklassen
+        thumb.unlink(missing_ok=True)
+        if not shared:
+            (THUMB_DIR / f"{thumb_hash}.webp").unlink(missing_ok=True)
+        return None
+    return thumb_hash
+
+def _render_thumb(name: str):
+    src = UPLOAD_DIR / name
+    dst = THUMB_DIR / (_stem(name) + ".webp")
+    if not dst.is_file():
+        if not src.is_file():
+            return  # inzwischen gelöscht
+        # Erst unter eigenem Namen schreiben: ein Absturz hinterlässt kein halbes
+        # Thumbnail, das beim nächsten Start für fertig gehalten würde
+        tmp = THUMB_DIR / f".{_stem(name)}-{secrets.token_hex(4)}.part.webp"
+        try:
+            make_thumb(src, tmp)
+            os.replace(tmp, dst)
+        finally:
+            tmp.unlink(missing_ok=True)
+        drop_page_cache(src)
+    hash_thumb(name, dst)
+
+def _log_thumb_failure(name: str, future: Future):
+    exc = future.exception()
+    if exc is not None:
+        app.logger.error("Thumbnail für %s fehlgeschlagen", name, exc_info=exc)
+
+def submit_thumb(name: str) -> Future:
+    # Pillow gibt den GIL beim Dekodieren/Skalieren/Kodieren frei, Threads reichen
+    future = THUMB_POOL.submit(_render_thumb, name)
+    future.add_done_callback(partial(_log_thumb_failure, name))
+    return future
+
+def requeue_thumbs():
+    # Aufträge überleben keinen Neustart: Fotos ohne thumb_hash wieder einreihen.
+    # Ein schon fertiges Thumbnail (aus der Zeit vor thumb_hash) wird nur gehasht.
+    with db() as con:
+        names = [row[0] for row in tuple_cursor(con).execute(
+            "SELECT filename FROM media WHERE thumb_hash IS NULL"
+        )]
+    for name in names:
+        submit_thumb(name)
+
+CROCKFORD32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+def ulid(now_ns: int) -> str:
+    # 48 Bit Millisekunden + 80 Bit Zufall als 26 Zeichen Crockford-Base32,
+    # dadurch sortieren die Dateinamen chronologisch
+    value = (now_ns // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    return "".join(CROCKFORD32[(value >> shift) & 31] for shift in range(125, -1, -5))
+
+# -------------------- Streaming-Upload --------------------
+class StreamedFile(NamedTuple):
+    # Upload, der beim Parsen direkt nach UPLOAD_DIR geschrieben wurde
+    filename: str
+    path: pathlib.Path
+    content_length: int
+
+def discard_upload(upload):
+    if isinstance(upload, StreamedFile):
+        upload.path.unlink(missing_ok=True)
+
+UPLOAD_CHUNK = 1 << 20  # Lese- und Schreibblock beim Streaming-Upload
+
+if StreamingFormDataParser is not None:
+    class MultiFileTarget(BaseTarget):
+        """Schreibt jede Datei eines Mehrfach-Feldes in eine eigene Datei."""
+
+        def __init__(self):
+            super().__init__()
+            self.files = []
+            self._fd = None
+            self._path = None
+            self._size = 0
+
+        def on_start(self):
+            self._path = UPLOAD_DIR / f".upload-{secrets.token_hex(16)}.part"
+            # 1 MiB Puffer: die Parser-Häppchen gehen gesammelt auf die Platte
+            self._fd = open(self._path, "wb", buffering=UPLOAD_CHUNK)
+            self._size = 0
+
+        def on_data_received(self, chunk: bytes):
+            self._fd.write(chunk)
+            self._size += len(chunk)
+
+        def on_finish(self):
+            self._fd.close()
+            self._fd = None
+            if self.multipart_filename:
+                self.files.append(StreamedFile(self.multipart_filename, self._path, self._size))
+            else:
+                self._path.unlink(missing_ok=True)  # leeres Dateifeld
+
+        def discard(self):
+            if self._fd is not None:
+                self._fd.close()
+                self._path.unlink(missing_ok=True)
+            for f in self.files:
+                discard_upload(f)
+            self.files = []
+
+def parse_upload_stream() -> tuple:
+    """Parst den Multipart-Body in Blöcken, Dateien landen direkt auf der Platte."""
+    parser = StreamingFormDataParser(headers=request.headers)
+    code = ValueTarget()
+    files = MultiFileTarget()
+    parser.register("code", code)
+    parser.register("files", files)
+    try:
+        while True:
+            chunk = request.stream.read(UPLOAD_CHUNK)
+            if not chunk:
+                break
+            parser.data_received(chunk)
+    except Exception:
+        files.discard()
+        raise
+    return (code.value.decode("utf-8", "replace") if code.value else None), files.files
 
-def save_image(file_storage, uploader_ip: str) -> str:
+def _write_image(file_storage) -> tuple:
     orig = secure_filename(file_storage.filename or "upload")
-    ext = orig.rsplit(".", 1)[-1].lower()
-    if not allowed(orig):
+    ext = _ext(orig)
+    if ext not in ALLOWED_EXT:
+        discard_upload(file_storage)
         raise ValueError("Dateityp nicht erlaubt")
 
-    name = f"{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(4)}.{ext}"
+    # Ein Zeitstempel für Dateiname und DB-Eintrag
+    now_ns = time.time_ns()
+    ts = datetime.fromtimestamp(now_ns / 1_000_000_000, tz=timezone.utc)
+    name = f"{ulid(now_ns)}.{ext}"
     path = UPLOAD_DIR / name
-    file_storage.save(path)
-
-    thumb = THUMB_DIR / (path.stem + ".webp")
-    make_thumb(path, thumb)
+    if isinstance(file_storage, StreamedFile):
+        os.replace(file_storage.path, path)  # liegt schon in UPLOAD_DIR, nur umbenennen
+    else:
+        copy_stream(file_storage.stream, path)
+    return name, orig, f"{ts:%Y-%m-%dT%H:%M:%S.%f}"
+
+def _persist(name: str, orig: str, uploader_ip: str, ts: str, con: sqlite3.Connection) -> int:
+    # Kollisionen sind bei ULID-Namen praktisch ausgeschlossen; UNIQUE bleibt als Absicherung
+    row = con.execute(
+        "INSERT INTO media(filename, orig_name, uploader_ip, created_at) VALUES(?,?,?,?) RETURNING id",
+        (name, orig, uploader_ip, ts)
+    ).fetchone()
+    return row[0]
+
+def save_image_files(files: Iterable, uploader_ip: str) -> list:
+    """Speichert alle Dateien und trägt sie in einer einzigen Transaktion ein.
+
+    Liefert pro Datei ``(filename, media_id, None)`` bei Erfolg oder
+    ``(None, None, exception)``.
+    """
+    results = []
+    stored = []
+    for file_storage in files:
+        try:
+            name, orig, ts = _write_image(file_storage)
+        except Exception as e:
+            results.append((None, None, e))
+            continue
+        stored.append((len(results), name, orig, ts))
+        results.append((name, None, None))
+
+    if stored:
+        try:
+            with db() as con:
+                con.execute("BEGIN")
+                for i, name, orig, ts in stored:
+                    results[i] = (name, _persist(name, orig, uploader_ip, ts, con), None)
+        except sqlite3.Error as e:
+            for i, name, _, _ in stored:
+                (UPLOAD_DIR / name).unlink(missing_ok=True)
+                results[i] = (None, None, e)
+        else:
+            # Erst nach dem Commit, damit hash_thumb die Zeile sicher findet
+            for _, name, _, _ in stored:
+                submit_thumb(name)
+    return results
+
+# -------------------- Assets --------------------
+# CSS/JS werden beim Start einmal gelesen, vorkomprimiert und unter einem
+# Content-Hash ausgeliefert, damit Browser sie unbegrenzt cachen dürfen.
+ASSET_FILES = ("css/styles.css", "js/main.js", "js/upload.js")
+ASSET_MIMETYPES = {"css": "text/css; charset=utf-8", "js": "text/javascript; charset=utf-8"}
+ASSETS = {}      # gehashter Name -> {"mimetype": ..., "identity"/"gzip"/"br": Bytes}
+ASSET_NAMES = {} # Originalname -> gehashter Name
+
+def load_assets():
+    for rel in ASSET_FILES:
+        data = (STATIC_DIR / rel).read_bytes()
+        stem, _, suffix = rel.rpartition(".")
+        hashed = f"{stem}.{hashlib.blake2b(data, digest_size=6).hexdigest()}.{suffix}"
+        variants = {
+            "mimetype": ASSET_MIMETYPES[suffix],
+            "identity": data,
+            "gzip": gzip.compress(data, compresslevel=9),
+        }
+        if brotli is not None:
+            variants["br"] = brotli.compress(data, quality=11)
+        ASSETS[hashed] = variants
+        ASSET_NAMES[rel] = hashed
+load_assets()
 
-    with db() as con:
-        con.execute(
-            "INSERT OR IGNORE INTO media(filename, orig_name, uploader_ip, created_at) VALUES(?,?,?,?)",
-            (name, orig, uploader_ip, datetime.utcnow().isoformat())
-        )
-    return name
+@app.template_global()
+def asset_url(rel: str) -> str:
+    return url_for("asset", filename=ASSET_NAMES[rel])
 
 # -------------------- Templates --------------------
 BASE_TMPL = """
@@ -115,697 +538,7 @@ BASE_TMPL = """
   <title>{{ title }}</title>
   <meta name="viewport" content="width=device-width, initial-scale=1">
   <link href="https://fonts.googleapis.com/css2?family=Dancing+Script:wght@400;600;700&family=Poppins:wght@300;400;500;600&display=swap" rel="stylesheet">
-  <style>
-    :root {
-      --wedding-primary: #d4af37;
-      --wedding-secondary: #f8f4e8;
-      --wedding-accent: #8b4513;
-      --wedding-text: #2c2c2c;
-      --wedding-light: #ffffff;
-      --wedding-shadow: rgba(212, 175, 55, 0.2);
-      --gradient-overlay: linear-gradient(135deg, rgba(248, 244, 232, 0.95) 0%, rgba(255, 255, 255, 0.9) 100%);
-    }
-
-    * {
-      box-sizing: border-box;
-    }
-
-    body {
-      font-family: 'Poppins', sans-serif;
-      margin: 0;
-      padding: 0;
-      background: var(--wedding-secondary);
-      background-image: 
-        url('/static/backgroundBild.JPG'),
-        url('data:image/svg+xml,<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100"><defs><pattern id="hearts" x="0" y="0" width="20" height="20" patternUnits="userSpaceOnUse"><path d="M10,6 C12,4 15,4 17,6 C19,4 22,4 24,6 C22,8 17,13 12,18 C7,13 2,8 0,6 C2,4 5,4 7,6" fill="%23d4af37" opacity="0.1"/></pattern></defs><rect width="100" height="100" fill="url(%23hearts)"/></svg>'),
-        linear-gradient(45deg, #f8f4e8 25%, transparent 25%),
-        linear-gradient(-45deg, #f8f4e8 25%, transparent 25%);
-      background-size: cover, 200px 200px, 60px 60px, 60px 60px;
-      background-attachment: fixed, scroll, scroll, scroll;
-      background-repeat: no-repeat, repeat, repeat, repeat;
-      color: var(--wedding-text);
-      line-height: 1.6;
-      min-height: 100vh;
-      position: relative;
-    }
-
-    body::before {
-      content: '';
-      position: fixed;
-      top: 0;
-      left: 0;
-      width: 100%;
-      height: 100%;
-      background: var(--gradient-overlay);
-      z-index: -1;
-    }
-
-    .container {
-      max-width: 1200px;
-      margin: 0 auto;
-      padding: 20px;
-      position: relative;
-      z-index: 1;
-    }
-
-    header {
-      background: var(--wedding-light);
-      backdrop-filter: blur(10px);
-      border-radius: 20px;
-      box-shadow: 0 10px 30px var(--wedding-shadow);
-      margin-bottom: 30px;
-      padding: 25px 30px;
-      border: 1px solid rgba(212, 175, 55, 0.3);
-    }
-
-    .header-content {
-      display: flex;
-      align-items: center;
-      justify-content: space-between;
-      flex-wrap: wrap;
-      gap: 20px;
-    }
-
-    .logo {
-      font-family: 'Dancing Script', cursive;
-      font-size: 2.5rem;
-      font-weight: 700;
-      color: var(--wedding-primary);
-      margin: 0;
-      text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
-    }
-
-    .nav-buttons {
-      display: flex;
-      gap: 15px;
-      align-items: center;
-    }
-
-    .btn {
-      background: var(--wedding-primary);
-      color: var(--wedding-light);
-      border: none;
-      padding: 12px 24px;
-      border-radius: 25px;
-      font-family: 'Poppins', sans-serif;
-      font-weight: 500;
-      font-size: 0.95rem;
-      cursor: pointer;
-      transition: all 0.3s ease;
-      text-decoration: none;
-      display: inline-block;
-      box-shadow: 0 4px 15px rgba(212, 175, 55, 0.3);
-    }
-
-    .btn:hover {
-      background: var(--wedding-accent);
-      transform: translateY(-2px);
-      box-shadow: 0 6px 20px rgba(212, 175, 55, 0.4);
-      color: var(--wedding-light);
-      text-decoration: none;
-    }
-
-    .btn-secondary {
-      background: transparent;
-      color: var(--wedding-primary);
-      border: 2px solid var(--wedding-primary);
-    }
-
-    .btn-secondary:hover {
-      background: var(--wedding-primary);
-      color: var(--wedding-light);
-    }
-
-    .qr-container {
-      position: relative;
-    }
-
-    .qr-toggle {
-      background: var(--wedding-secondary);
-      color: var(--wedding-primary);
-      border: 2px solid var(--wedding-primary);
-      padding: 8px 16px;
-      border-radius: 20px;
-      cursor: pointer;
-      font-size: 0.9rem;
-      font-weight: 500;
-    }
-
-    .qr-dropdown {
-      position: absolute;
-      top: 100%;
-      right: 0;
-      background: var(--wedding-light);
-      border-radius: 15px;
-      padding: 20px;
-      box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-      margin-top: 10px;
-      min-width: 200px;
-      text-align: center;
-      display: none;
-      z-index: 1000;
-    }
-
-    .qr-dropdown.show {
-      display: block;
-    }
-
-    .qr-code {
-      border-radius: 10px;
-      box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-      margin-bottom: 10px;
-    }
-
-    main {
-      background: var(--wedding-light);
-      border-radius: 20px;
-      padding: 40px;
-      box-shadow: 0 10px 30px var(--wedding-shadow);
-      margin-bottom: 30px;
-      border: 1px solid rgba(212, 175, 55, 0.3);
-    }
-
-    .page-title {
-      font-family: 'Dancing Script', cursive;
-      font-size: 2.2rem;
-      color: var(--wedding-primary);
-      text-align: center;
-      margin-bottom: 30px;
-      text-shadow: 1px 1px 3px rgba(0,0,0,0.1);
-    }
-
-    .modal {
-      display: none;
-      position: fixed;
-      z-index: 10000;
-      left: 0;
-      top: 0;
-      width: 100%;
-      height: 100%;
-      background: rgba(0, 0, 0, 0.95);
-      backdrop-filter: blur(10px);
-    }
-
-    .modal.show {
-      display: flex;
-      align-items: center;
-      justify-content: center;
-      animation: modalFadeIn 0.3s ease;
-    }
-
-    @keyframes modalFadeIn {
-      from { opacity: 0; }
-      to { opacity: 1; }
-    }
-
-    .modal-content {
-      position: relative;
-      max-width: 95vw;
-      max-height: 95vh;
-      margin: auto;
-      text-align: center;
-      animation: modalSlideIn 0.4s ease;
-    }
-
-    @keyframes modalSlideIn {
-      from { 
-        opacity: 0;
-        transform: scale(0.8) translateY(20px);
-      }
-      to { 
-        opacity: 1;
-        transform: scale(1) translateY(0);
-      }
-    }
-
-    .modal img {
-      max-width: 100%;
-      max-height: 85vh;
-      object-fit: contain;
-      border-radius: 15px;
-      box-shadow: 0 20px 60px rgba(0, 0, 0, 0.8);
-      transition: transform 0.3s ease;
-    }
-
-    .modal-header {
-      position: absolute;
-      top: 20px;
-      left: 50%;
-      transform: translateX(-50%);
-      background: rgba(255, 255, 255, 0.95);
-      backdrop-filter: blur(10px);
-      padding: 10px 20px;
-      border-radius: 25px;
-      color: var(--wedding-text);
-      font-weight: 500;
-      font-size: 0.9rem;
-      box-shadow: 0 4px 15px rgba(0, 0, 0, 0.3);
-      z-index: 1001;
-    }
-
-    .modal-nav {
-      position: absolute;
-      top: 50%;
-      transform: translateY(-50%);
-      background: var(--wedding-primary);
-      color: var(--wedding-light);
-      border: none;
-      width: 50px;
-      height: 50px;
-      border-radius: 50%;
-      cursor: pointer;
-      font-size: 1.5rem;
-      display: flex;
-      align-items: center;
-      justify-content: center;
-      transition: all 0.3s ease;
-      box-shadow: 0 4px 15px rgba(212, 175, 55, 0.4);
-      z-index: 1001;
-    }
-
-    .modal-nav:hover {
-      background: var(--wedding-accent);
-      transform: translateY(-50%) scale(1.1);
-      box-shadow: 0 6px 20px rgba(212, 175, 55, 0.6);
-    }
-
-    .modal-prev {
-      left: 30px;
-    }
-
-    .modal-next {
-      right: 30px;
-    }
-
-    .modal-close {
-      position: absolute;
-      top: 20px;
-      right: 30px;
-      background: rgba(255, 255, 255, 0.9);
-      color: var(--wedding-text);
-      border: none;
-      width: 45px;
-      height: 45px;
-      border-radius: 50%;
-      cursor: pointer;
-      font-size: 1.5rem;
-      display: flex;
-      align-items: center;
-      justify-content: center;
-      transition: all 0.3s ease;
-      box-shadow: 0 4px 15px rgba(0, 0, 0, 0.3);
-      z-index: 1001;
-    }
-
-    .modal-close:hover {
-      background: #dc3545;
-      color: white;
-      transform: rotate(90deg) scale(1.1);
-    }
-
-    .modal-counter {
-      position: absolute;
-      bottom: 30px;
-      left: 50%;
-      transform: translateX(-50%);
-      background: rgba(255, 255, 255, 0.9);
-      backdrop-filter: blur(10px);
-      padding: 8px 16px;
-      border-radius: 20px;
-      color: var(--wedding-text);
-      font-size: 0.9rem;
-      font-weight: 500;
-      box-shadow: 0 4px 15px rgba(0, 0, 0, 0.3);
-      z-index: 1001;
-    }
-
-    .modal-download {
-      position: absolute;
-      bottom: 20px;
-      right: 30px;
-      background: var(--wedding-primary);
-      color: var(--wedding-light);
-      border: none;
-      padding: 12px 20px;
-      border-radius: 25px;
-      cursor: pointer;
-      font-size: 0.9rem;
-      font-weight: 500;
-      display: flex;
-      align-items: center;
-      gap: 8px;
-      transition: all 0.3s ease;
-      box-shadow: 0 4px 15px rgba(212, 175, 55, 0.4);
-      z-index: 1001;
-    }
-
-    .modal-download:hover {
-      background: var(--wedding-accent);
-      transform: translateY(-2px);
-      box-shadow: 0 6px 20px rgba(212, 175, 55, 0.6);
-    }
-
-    @media (max-width: 768px) {
-      .modal-header {
-        position: fixed;
-        top: 10px;
-        left: 10px;
-        right: 10px;
-        transform: none;
-        font-size: 0.8rem;
-        padding: 8px 15px;
-      }
-
-      .modal-close {
-        top: 10px;
-        right: 10px;
-        width: 40px;
-        height: 40px;
-        font-size: 1.2rem;
-      }
-
-      .modal-nav {
-        width: 45px;
-        height: 45px;
-        font-size: 1.2rem;
-      }
-
-      .modal-prev {
-        left: 15px;
-      }
-
-      .modal-next {
-        right: 15px;
-      }
-
-      .modal-counter {
-        bottom: 15px;
-        font-size: 0.8rem;
-        padding: 6px 12px;
-      }
-
-      .modal-download {
-        bottom: 15px;
-        right: 15px;
-        padding: 10px 16px;
-        font-size: 0.8rem;
-      }
-    }
-
-    .grid {
-      display: grid;
-      grid-template-columns: repeat(auto-fill, minmax(280px, 1fr));
-      gap: 25px;
-      margin-top: 30px;
-    }
-
-    .photo-card {
-      background: var(--wedding-light);
-      border-radius: 15px;
-      overflow: hidden;
-      box-shadow: 0 8px 25px rgba(0,0,0,0.1);
-      transition: all 0.3s ease;
-      border: 1px solid rgba(212, 175, 55, 0.2);
-    }
-
-    .photo-card:hover {
-      transform: translateY(-5px);
-      box-shadow: 0 15px 40px rgba(0,0,0,0.2);
-    }
-
-    .photo-card img {
-      width: 100%;
-      height: 250px;
-      object-fit: cover;
-      transition: transform 0.3s ease;
-    }
-
-    .photo-card:hover img {
-      transform: scale(1.05);
-    }
-
-    .card-content {
-      padding: 20px;
-    }
-
-    .photo-date {
-      color: var(--wedding-accent);
-      font-size: 0.9rem;
-      font-weight: 500;
-      margin-bottom: 10px;
-    }
-
-    .upload-form {
-      background: var(--wedding-secondary);
-      border-radius: 15px;
-      padding: 30px;
-      margin: 30px 0;
-      border: 2px dashed var(--wedding-primary);
-    }
-
-    .form-group {
-      margin-bottom: 25px;
-    }
-
-    label {
-      display: block;
-      font-weight: 500;
-      color: var(--wedding-text);
-      margin-bottom: 8px;
-      font-size: 1.1rem;
-    }
-
-    input[type="password"], input[type="file"] {
-      width: 100%;
-      padding: 15px 20px;
-      border: 2px solid rgba(212, 175, 55, 0.3);
-      border-radius: 10px;
-      font-size: 1rem;
-      background: var(--wedding-light);
-      transition: border-color 0.3s ease;
-    }
-
-    input[type="password"]:focus, input[type="file"]:focus {
-      outline: none;
-      border-color: var(--wedding-primary);
-      box-shadow: 0 0 0 3px rgba(212, 175, 55, 0.2);
-    }
-
-    .alert {
-      background: #fee;
-      border: 1px solid #fcc;
-      color: #c33;
-      padding: 15px 20px;
-      border-radius: 10px;
-      margin-bottom: 20px;
-      font-weight: 500;
-    }
-
-    .alert.success {
-      background: #efe;
-      border-color: #cfc;
-      color: #363;
-    }
-
-    footer {
-      text-align: center;
-      color: var(--wedding-accent);
-      font-size: 0.9rem;
-      padding: 20px;
-      background: rgba(255,255,255,0.8);
-      border-radius: 15px;
-      backdrop-filter: blur(10px);
-    }
-
-    .delete-btn {
-      background: #dc3545;
-      color: white;
-      border: none;
-      padding: 8px 16px;
-      border-radius: 20px;
-      font-size: 0.8rem;
-      cursor: pointer;
-      transition: all 0.3s ease;
-      width: 100%;
-      margin-top: 10px;
-    }
-
-    .delete-btn:hover {
-      background: #c82333;
-      transform: translateY(-1px);
-    }
-
-    .empty-state {
-      text-align: center;
-      padding: 60px 20px;
-      color: var(--wedding-accent);
-    }
-
-    .empty-state::before {
-      content: "💍";
-      font-size: 4rem;
-      display: block;
-      margin-bottom: 20px;
-    }
-
-    .file-upload-area {
-      border: 3px dashed var(--wedding-primary);
-      border-radius: 15px;
-      padding: 40px 20px;
-      text-align: center;
-      cursor: pointer;
-      transition: all 0.3s ease;
-      background: var(--wedding-light);
-      position: relative;
-      overflow: hidden;
-    }
-
-    .file-upload-area:hover {
-      border-color: var(--wedding-accent);
-      background: var(--wedding-secondary);
-      transform: translateY(-2px);
-    }
-
-    .file-upload-area.dragover {
-      border-color: var(--wedding-accent);
-      background: rgba(212, 175, 55, 0.1);
-      border-style: solid;
-    }
-
-    .upload-icon {
-      font-size: 3rem;
-      margin-bottom: 15px;
-      opacity: 0.8;
-    }
-
-    .upload-text {
-      color: var(--wedding-text);
-      font-size: 1.1rem;
-    }
-
-    .file-list {
-      margin-top: 20px;
-    }
-
-    .file-item {
-      background: var(--wedding-light);
-      border: 1px solid rgba(212, 175, 55, 0.3);
-      border-radius: 10px;
-      padding: 12px 15px;
-      margin: 8px 0;
-      display: flex;
-      align-items: center;
-      justify-content: space-between;
-      transition: all 0.2s ease;
-    }
-
-    .file-item:hover {
-      box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-    }
-
-    .file-info {
-      display: flex;
-      align-items: center;
-      flex: 1;
-    }
-
-    .file-icon {
-      margin-right: 10px;
-      font-size: 1.2rem;
-    }
-
-    .file-details {
-      flex: 1;
-    }
-
-    .file-name {
-      font-weight: 500;
-      color: var(--wedding-text);
-      margin-bottom: 2px;
-    }
-
-    .file-size {
-      font-size: 0.8rem;
-      color: var(--wedding-accent);
-    }
-
-    .file-remove {
-      background: #dc3545;
-      color: white;
-      border: none;
-      border-radius: 50%;
-      width: 24px;
-      height: 24px;
-      cursor: pointer;
-      font-size: 0.8rem;
-      display: flex;
-      align-items: center;
-      justify-content: center;
-      transition: all 0.2s ease;
-    }
-
-    .file-remove:hover {
-      background: #c82333;
-      transform: scale(1.1);
-    }
-
-    .progress-bar {
-      width: 100%;
-      height: 4px;
-      background: rgba(212, 175, 55, 0.2);
-      border-radius: 2px;
-      margin-top: 8px;
-      overflow: hidden;
-    }
-
-    .progress-fill {
-      height: 100%;
-      background: var(--wedding-primary);
-      border-radius: 2px;
-      transition: width 0.3s ease;
-      width: 0%;
-    }
-
-    @media (max-width: 768px) {
-      .container {
-        padding: 15px;
-      }
-
-      .header-content {
-        flex-direction: column;
-        text-align: center;
-      }
-
-      .logo {
-        font-size: 2rem;
-      }
-
-      main {
-        padding: 25px 20px;
-      }
-
-      .grid {
-        grid-template-columns: repeat(auto-fill, minmax(250px, 1fr));
-        gap: 20px;
-      }
-
-      .nav-buttons {
-        justify-content: center;
-        flex-wrap: wrap;
-      }
-    }
-
-    @media (max-width: 480px) {
-      .grid {
-        grid-template-columns: 1fr;
-      }
-      
-      .btn {
-        padding: 10px 20px;
-        font-size: 0.9rem;
-      }
-    }
-  </style>
+  <link rel="stylesheet" href="{{ asset_url('css/styles.css') }}">
 </head>
 <body>
   <div class="container">
@@ -818,7 +551,7 @@ BASE_TMPL = """
           <div class="qr-container">
             <button class="qr-toggle" onclick="toggleQR()">QR Code</button>
             <div class="qr-dropdown" id="qrDropdown">
-              <img class="qr-code" alt="QR Code" src="{{ url_for('qr_png') }}">
+              <img class="qr-code" alt="QR Code" src="{{ url_for('qr_svg') }}">
               <div style="font-size: 0.8rem; color: var(--wedding-accent);">
                 {{ public_url or request.url_root.rstrip('/') }}
               </div>
@@ -866,351 +599,8 @@ BASE_TMPL = """
     </div>
   </div>
 
-  <script>
-    function toggleQR() {
-      const dropdown = document.getElementById('qrDropdown');
-      dropdown.classList.toggle('show');
-    }
-
-    // Close QR dropdown when clicking outside
-    document.addEventListener('click', function(event) {
-      const qrContainer = document.querySelector('.qr-container');
-      const dropdown = document.getElementById('qrDropdown');
-      
-      if (!qrContainer.contains(event.target)) {
-        dropdown.classList.remove('show');
-      }
-    });
-
-    // Image Modal Functionality
-    let currentImageIndex = 0;
-    let allImages = [];
-
-    function initImageModal() {
-      const modal = document.getElementById('imageModal');
-      const modalImage = document.getElementById('modalImage');
-      const modalClose = document.getElementById('modalClose');
-      const modalPrev = document.getElementById('modalPrev');
-      const modalNext = document.getElementById('modalNext');
-      const modalCounter = document.getElementById('modalCounter');
-      const modalImageName = document.getElementById('modalImageName');
-      const modalDownload = document.getElementById('modalDownload');
-
-      // Collect all images from the gallery
-      const imageCards = document.querySelectorAll('.photo-card');
-      allImages = Array.from(imageCards).map(card => {
-        const img = card.querySelector('img');
-        const link = card.querySelector('a');
-        const date = card.querySelector('.photo-date');
-        return {
-          thumb: img.src,
-          full: link.href,
-          alt: img.alt,
-          name: img.alt,
-          date: date ? date.textContent : ''
-        };
-      });
-
-      // Add click handlers to all photo cards
-      imageCards.forEach((card, index) => {
-        const link = card.querySelector('a');
-        if (link) {
-          link.addEventListener('click', (e) => {
-            e.preventDefault();
-            openModal(index);
-          });
-        }
-      });
-
-      function openModal(index) {
-        currentImageIndex = index;
-        updateModalContent();
-        modal.classList.add('show');
-        document.body.style.overflow = 'hidden';
-        
-        // Focus management for accessibility
-        modalClose.focus();
-      }
-
-      function closeModal() {
-        modal.classList.remove('show');
-        document.body.style.overflow = '';
-      }
-
-      function updateModalContent() {
-        if (allImages.length === 0) return;
-        
-        const image = allImages[currentImageIndex];
-        modalImage.src = image.full;
-        modalImage.alt = image.alt;
-        modalImageName.textContent = image.name;
-        modalCounter.textContent = `${currentImageIndex + 1} von ${allImages.length}`;
-        modalDownload.href = image.full;
-        modalDownload.download = image.name;
-
-        // Update navigation button states
-        modalPrev.style.opacity = currentImageIndex === 0 ? '0.5' : '1';
-        modalNext.style.opacity = currentImageIndex === allImages.length - 1 ? '0.5' : '1';
-      }
-
-      function showPrevImage() {
-        if (currentImageIndex > 0) {
-          currentImageIndex--;
-          updateModalContent();
-        }
-      }
-
-      function showNextImage() {
-        if (currentImageIndex < allImages.length - 1) {
-          currentImageIndex++;
-          updateModalContent();
-        }
-      }
-
-      // Event listeners
-      modalClose.addEventListener('click', closeModal);
-      modalPrev.addEventListener('click', showPrevImage);
-      modalNext.addEventListener('click', showNextImage);
-
-      // Close modal when clicking outside the image
-      modal.addEventListener('click', (e) => {
-        if (e.target === modal) {
-          closeModal();
-        }
-      });
-
-      // Keyboard navigation
-      document.addEventListener('keydown', (e) => {
-        if (modal.classList.contains('show')) {
-          switch(e.key) {
-            case 'Escape':
-              closeModal();
-              break;
-            case 'ArrowLeft':
-              showPrevImage();
-              break;
-            case 'ArrowRight':
-              showNextImage();
-              break;
-          }
-        }
-      });
-
-      // Touch/swipe support for mobile
-      let touchStartX = 0;
-      let touchEndX = 0;
-
-      modal.addEventListener('touchstart', (e) => {
-        touchStartX = e.changedTouches[0].screenX;
-      });
-
-      modal.addEventListener('touchend', (e) => {
-        touchEndX = e.changedTouches[0].screenX;
-        handleSwipe();
-      });
-
-      function handleSwipe() {
-        const swipeThreshold = 50;
-        const swipeDistance = touchEndX - touchStartX;
-        
-        if (Math.abs(swipeDistance) > swipeThreshold) {
-          if (swipeDistance > 0) {
-            showPrevImage(); // Swipe right = previous image
-          } else {
-            showNextImage(); // Swipe left = next image
-          }
-        }
-      }
-
-      // Preload adjacent images for smoother experience
-      function preloadImages() {
-        const preloadNext = currentImageIndex < allImages.length - 1 ? currentImageIndex + 1 : null;
-        const preloadPrev = currentImageIndex > 0 ? currentImageIndex - 1 : null;
-        
-        [preloadNext, preloadPrev].forEach(index => {
-          if (index !== null) {
-            const img = new Image();
-            img.src = allImages[index].full;
-          }
-        });
-      }
-
-      // Add image load event listener for preloading
-      modalImage.addEventListener('load', preloadImages);
-    }
-
-    // File upload functionality
-    document.addEventListener('DOMContentLoaded', function() {
-      // Initialize image modal
-      initImageModal();
-      
-      const uploadArea = document.querySelector('.file-upload-area');
-      const fileInput = document.getElementById('fileInput');
-      const fileList = document.getElementById('fileList');
-      const uploadForm = document.querySelector('form[enctype="multipart/form-data"]');
-      
-      let selectedFiles = [];
-      const maxFileSize = {{ max_mb }} * 1024 * 1024;
-      const allowedTypes = [{% for ext in allowed %}'{{ ext }}'{% if not loop.last %}, {% endif %}{% endfor %}];
-      
-      // File input change handler
-      if (fileInput) {
-        fileInput.addEventListener('change', function(e) {
-          handleFiles(e.target.files);
-        });
-      }
-      
-      // Drag and drop handlers
-      if (uploadArea) {
-        uploadArea.addEventListener('dragover', function(e) {
-          e.preventDefault();
-          this.classList.add('dragover');
-        });
-        
-        uploadArea.addEventListener('dragleave', function(e) {
-          e.preventDefault();
-          this.classList.remove('dragover');
-        });
-        
-        uploadArea.addEventListener('drop', function(e) {
-          e.preventDefault();
-          this.classList.remove('dragover');
-          handleFiles(e.dataTransfer.files);
-        });
-      }
-      
-      // Handle selected files
-      function handleFiles(files) {
-        for (let file of files) {
-          if (validateFile(file)) {
-            if (!selectedFiles.find(f => f.name === file.name && f.size === file.size)) {
-              selectedFiles.push(file);
-            }
-          }
-        }
-        updateFileList();
-        updateFileInput();
-      }
-      
-      // Validate file
-      function validateFile(file) {
-        const fileExt = file.name.split('.').pop().toLowerCase();
-        
-        if (!allowedTypes.includes(fileExt)) {
-          showMessage('Dateityp nicht erlaubt: ' + file.name, 'error');
-          return false;
-        }
-        
-        if (file.size > maxFileSize) {
-          showMessage('Datei zu groß: ' + file.name + ' (' + formatFileSize(file.size) + ')', 'error');
-          return false;
-        }
-        
-        return true;
-      }
-      
-      // Update file list display
-      function updateFileList() {
-        if (!fileList) return;
-        
-        fileList.innerHTML = '';
-        selectedFiles.forEach((file, index) => {
-          const fileItem = document.createElement('div');
-          fileItem.className = 'file-item';
-          fileItem.innerHTML = `
-            <div class="file-info">
-              <div class="file-icon">🖼️</div>
-              <div class="file-details">
-                <div class="file-name">${file.name}</div>
-                <div class="file-size">${formatFileSize(file.size)}</div>
-              </div>
-            </div>
-            <button type="button" class="file-remove" onclick="removeFile(${index})" title="Datei entfernen">×</button>
-          `;
-          fileList.appendChild(fileItem);
-        });
-      }
-      
-      // Remove file from selection
-      window.removeFile = function(index) {
-        selectedFiles.splice(index, 1);
-        updateFileList();
-        updateFileInput();
-      };
-      
-      // Update hidden file input with selected files
-      function updateFileInput() {
-        if (!fileInput) return;
-        
-        const dt = new DataTransfer();
-        selectedFiles.forEach(file => dt.items.add(file));
-        fileInput.files = dt.files;
-      }
-      
-      // Format file size
-      function formatFileSize(bytes) {
-        if (bytes === 0) return '0 Bytes';
-        const k = 1024;
-        const sizes = ['Bytes', 'KB', 'MB', 'GB'];
-        const i = Math.floor(Math.log(bytes) / Math.log(k));
-        return parseFloat((bytes / Math.pow(k, i)).toFixed(2)) + ' ' + sizes[i];
-      }
-      
-      // Show message
-      function showMessage(message, type) {
-        const alertDiv = document.createElement('div');
-        alertDiv.className = 'alert' + (type === 'error' ? '' : ' success');
-        alertDiv.textContent = message;
-        
-        const main = document.querySelector('main');
-        if (main) {
-          main.insertBefore(alertDiv, main.firstChild);
-          setTimeout(() => alertDiv.remove(), 5000);
-        }
-      }
-      
-      // Form submission handler
-      if (uploadForm) {
-        uploadForm.addEventListener('submit', function(e) {
-          if (selectedFiles.length === 0) {
-            e.preventDefault();
-            showMessage('Bitte wählt mindestens eine Datei aus.', 'error');
-            return;
-          }
-          
-          const submitBtn = this.querySelector('button[type="submit"]');
-          if (submitBtn) {
-            submitBtn.innerHTML = '💕 Wird hochgeladen...';
-            submitBtn.disabled = true;
-            
-            // Add progress bar
-            const progressDiv = document.createElement('div');
-            progressDiv.innerHTML = `
-              <div class="progress-bar">
-                <div class="progress-fill"></div>
-              </div>
-              <div style="text-align: center; margin-top: 10px; font-size: 0.9rem; color: var(--wedding-accent);">
-                Eure Fotos werden hochgeladen... ✨
-              </div>
-            `;
-            submitBtn.parentNode.appendChild(progressDiv);
-            
-            // Simulate progress (since we can't track real progress easily)
-            let progress = 0;
-            const progressBar = progressDiv.querySelector('.progress-fill');
-            const interval = setInterval(() => {
-              progress += Math.random() * 20;
-              if (progress > 90) progress = 90;
-              progressBar.style.width = progress + '%';
-            }, 200);
-            
-            // Clean up on form completion (this won't run due to redirect, but good practice)
-            setTimeout(() => clearInterval(interval), 30000);
-          }
-        });
-      }
-    });
-  </script>
+  <script src="{{ asset_url('js/main.js') }}"></script>
+  {% block scripts %}{% endblock %}
 </body>
 </html>
 """
@@ -1222,24 +612,13 @@ INDEX_TMPL = """
 
 {% if items %}
   <div class="grid">
-    {% for f in items %}
-      <div class="photo-card">
-        <a href="{{ url_for('file_raw', filename=f['filename']) }}" target="_blank" title="Original in voller Größe öffnen">
-          <img loading="lazy" src="{{ url_for('thumb_raw', thumb=f['thumb']) }}" alt="{{ f['orig_name'] or f['filename'] }}">
-        </a>
-        <div class="card-content">
-          <div class="photo-date">📅 {{ f['created_at'] }}</div>
-          {% if admin %}
-          <form method="post" action="{{ url_for('delete_file') }}" onsubmit="return confirm('Möchtest du dieses Foto wirklich löschen? 🗑️');" style="margin: 0;">
-            <input type="hidden" name="filename" value="{{ f['filename'] }}">
-            <input type="hidden" name="admin_token" value="{{ admin }}">
-            <button class="delete-btn" type="submit">🗑️ Löschen</button>
-          </form>
-          {% endif %}
-        </div>
-      </div>
-    {% endfor %}
+    {{ cards }}
+  </div>
+  {% if next_before %}
+  <div class="load-more">
+    <a href="{{ url_for('index', before=next_before, admin=admin) }}" class="btn">📷 Weitere Fotos laden</a>
   </div>
+  {% endif %}
 {% else %}
   <div class="empty-state">
     <h3 style="font-family: 'Dancing Script', cursive; font-size: 1.8rem; margin: 20px 0;">
@@ -1256,6 +635,54 @@ INDEX_TMPL = """
 {% endblock %}
 """
 
+# Die Fotokarten werden ohne Jinja per str.format zusammengesetzt: bei tausenden
+# Fotos kostet die Jinja-Schleife pro Karte deutlich mehr als ein format-Aufruf
+CARD_TMPL = (
+    '<div class="photo-card">'
+    '<a href="{full}" target="_blank" title="Original in voller Größe öffnen">'
+    '<img loading="lazy" src="{thumb}" alt="{alt}">'
+    '</a>'
+    '<div class="card-content">'
+    '<div class="photo-date">📅 {date}</div>'
+    '{admin_form}'
+    '</div>'
+    '</div>'
+)
+ADMIN_FORM_TMPL = (
+    '<form method="post" action="{action}" onsubmit="return confirm(\'Möchtest du dieses Foto wirklich löschen? 🗑️\');" style="margin: 0;">'
+    '<input type="hidden" name="filename" value="{filename}">'
+    '<input type="hidden" name="admin_token" value="{admin}">'
+    '<button class="delete-btn" type="submit">🗑️ Löschen</button>'
+    '</form>'
+)
+
+def _url_parts(endpoint: str, arg: str, **kwargs) -> tuple:
+    # url_for einmal mit Platzhalter aufrufen statt einmal pro Karte bzw. Zeile
+    head, _, tail = url_for(endpoint, **{arg: "__slot__"}, **kwargs).rpartition("__slot__")
+    return head, tail
+
+def render_cards(items: list, admin: Optional[str]) -> Markup:
+    file_head, file_tail = _url_parts("file_raw", "filename")
+    thumb_head, thumb_tail = _url_parts("thumb_raw", "thumb")
+    hashed_head, hashed_tail = _url_parts("thumb_hashed", "thumb_hash")
+    action = escape(url_for("delete_file"))
+    admin = escape(admin) if admin else None
+    cards = []
+    for f in items:
+        filename = escape(f["filename"])
+        if f["thumb_hash"]:
+            thumb = hashed_head + quote(f["thumb_hash"]) + hashed_tail
+        else:
+            thumb = thumb_head + quote(f["thumb"]) + thumb_tail
+        cards.append(CARD_TMPL.format(
+            full=escape(file_head + quote(f["filename"]) + file_tail),
+            thumb=escape(thumb),
+            alt=escape(f["orig_name"] or f["filename"]),
+            date=escape(f["created_at"]),
+            admin_form=ADMIN_FORM_TMPL.format(action=action, filename=filename, admin=admin) if admin else "",
+        ))
+    return Markup("".join(cards))
+
 UPLOAD_TMPL = """
 {% extends "_base" %}
 {% block content %}
@@ -1315,58 +742,120 @@ UPLOAD_TMPL = """
   </p>
 </div>
 {% endblock %}
+{% block scripts %}
+<script>
+  window.uploadConfig = {
+    maxFileSize: {{ max_mb }} * 1024 * 1024,
+    allowedTypes: {{ allowed|tojson }},
+    maxFileSizeMB: {{ max_mb }}
+  };
+</script>
+<script src="{{ asset_url('js/upload.js') }}"></script>
+{% endblock %}
 """
 
-# Base-Template als virtuelles Jinja-Template registrieren
+# Templates als virtuelle Jinja-Templates registrieren; so werden sie nur einmal
+# kompiliert statt bei jedem render_template_string-Aufruf
 app.jinja_loader = ChoiceLoader([
     app.jinja_loader,
-    DictLoader({"_base": BASE_TMPL})
+    DictLoader({"_base": BASE_TMPL, "index": INDEX_TMPL, "upload": UPLOAD_TMPL})
 ])
+app.jinja_env.auto_reload = False  # Templates ändern sich nur mit dem Code
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory=str(JINJA_CACHE_DIR))
+# Einmal beim Import laden; die Views rendern direkt ohne Loader-Lookup
+TEMPLATES = {name: app.jinja_env.get_template(name) for name in ("index", "upload")}
 
 # -------------------- Routes --------------------
+# Ändert sich mit jedem Deploy: die Templates stehen in dieser Datei, CSS/JS in ASSET_NAMES
+BUILD_TOKEN = hashlib.blake2b(
+    pathlib.Path(__file__).read_bytes() + repr(sorted(ASSET_NAMES.values())).encode(),
+    digest_size=6
+).hexdigest()
+
+def gallery_fingerprint(con: sqlite3.Connection) -> str:
+    # Der Zähler steigt mit jedem Upload, Löschen und fertigen Thumbnail (Trigger in init_db)
+    version = con.execute("SELECT version FROM gallery_version").fetchone()[0]
+    return f"{version}-{BUILD_TOKEN}"
+
 @app.route("/")
 def index():
     admin = request.args.get("admin")
+    before = request.args.get("before", type=int)
     items = []
     with db() as con:
-        for row in con.execute("SELECT filename, orig_name, created_at FROM media ORDER BY id DESC"):
+        # Unveränderte Galerie: Revalidierung ohne Abfrage der Zeilen und ohne Rendern
+        # beantworten; mit offenen Flash-Meldungen wird immer gerendert
+        fingerprint = gallery_fingerprint(con)
+        if "_flashes" not in session and request.if_none_match.contains_weak(fingerprint):
+            resp = make_response("", 304)
+            rows = None
+        else:
+            # Eine Zeile mehr als nötig zeigt, ob es eine weitere Seite gibt;
+            # die Anzeigeform des Datums erzeugt gleich SQLite
+            rows = tuple_cursor(con).execute(
+                "SELECT id, filename, orig_name, substr(replace(created_at, 'T', ' '), 1, 19), thumb_hash "
+                "FROM media " + gallery_where(before) + " ORDER BY id DESC LIMIT ?",
+                gallery_params(before, GALLERY_PAGE_SIZE + 1)
+            ).fetchall()
+    if rows is not None:
+        for media_id, filename, orig_name, created_at, thumb_hash in rows[:GALLERY_PAGE_SIZE]:
             items.append({
-                "filename": row["filename"],
-                "thumb": pathlib.Path(row["filename"]).stem + ".webp",
-                "orig_name": row["orig_name"],
-                "created_at": row["created_at"].replace("T", " ")[:19],
+                "id": media_id,
+                "filename": filename,
+                "thumb": _stem(filename) + ".webp",
+                "thumb_hash": thumb_hash,
+                "orig_name": orig_name,
+                "created_at": created_at,
             })
-    return render_template_string(
-        INDEX_TMPL,
-        title=TITLE, items=items, allowed=sorted(ALLOWED_EXT),
-        max_mb=MAX_CONTENT_LENGTH // (1024*1024), admin=admin,
-        public_url=PUBLIC_BASE_URL
-    )
+        next_before = items[-1]["id"] if len(rows) > GALLERY_PAGE_SIZE else None
+        resp = make_response(TEMPLATES["index"].render(
+            title=TITLE, items=items, cards=render_cards(items, admin), next_before=next_before,
+            allowed=sorted(ALLOWED_EXT),
+            max_mb=MAX_CONTENT_LENGTH // (1024*1024), admin=admin,
+            public_url=PUBLIC_BASE_URL
+        ))
+    resp.set_etag(fingerprint, weak=True)
+    resp.cache_control.max_age = 0
+    resp.cache_control.must_revalidate = True
+    return resp
 
 @app.route("/upload", methods=["GET", "POST"])
 def upload():
     if request.method == "POST":
-        if UPLOAD_CODE and request.form.get("code") != UPLOAD_CODE:
+        if StreamingFormDataParser is not None and request.mimetype == "multipart/form-data":
+            # Der Body lässt sich nur einmal lesen, danach gibt es keinen Rückfall auf request.files
+            try:
+                code, files = parse_upload_stream()
+            except Exception:
+                flash("Upload fehlgeschlagen.")
+                return redirect(url_for("upload"))
+        else:
+            code, files = request.form.get("code"), request.files.getlist("files")
+
+        if UPLOAD_CODE and code != UPLOAD_CODE:
+            for f in files:
+                discard_upload(f)
             flash("Falscher Code.")
             return redirect(url_for("upload"))
 
-        files = request.files.getlist("files")
         if not files:
             flash("Keine Dateien ausgewählt.")
             return redirect(url_for("upload"))
 
         saved, errors = 0, 0
         error_details = []
+        pending = []
         
         for f in files:
             if not f or not getattr(f, "filename", ""):
                 continue
                 
             filename = f.filename
-            if not allowed(filename):
+            ext = _ext(filename)
+            if ext not in ALLOWED_EXT:
                 errors += 1
-                ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else "?"
-                error_details.append(f"'{filename}': Dateityp .{ext} nicht erlaubt")
+                error_details.append(f"'{filename}': Dateityp .{ext or '?'} nicht erlaubt")
+                discard_upload(f)
                 continue
                 
             # Check file size
@@ -1374,17 +863,21 @@ def upload():
                 errors += 1
                 size_mb = f.content_length / (1024 * 1024)
                 error_details.append(f"'{filename}': Datei zu groß ({size_mb:.1f} MB)")
+                discard_upload(f)
                 continue
-                
-            try:
-                save_image(f, request.remote_addr or "")
+
+            pending.append(f)
+
+        # Alle gültigen Dateien mit einem einzigen Commit speichern
+        for f, (_, _, error) in zip(pending, save_image_files(pending, request.remote_addr or "")):
+            if error is None:
                 saved += 1
-            except ValueError as e:
+            elif isinstance(error, ValueError):
                 errors += 1
-                error_details.append(f"'{filename}': {str(e)}")
-            except Exception as e:
+                error_details.append(f"'{f.filename}': {str(error)}")
+            else:
                 errors += 1
-                error_details.append(f"'{filename}': Upload fehlgeschlagen")
+                error_details.append(f"'{f.filename}': Upload fehlgeschlagen")
 
         # Generate detailed feedback message
         if saved == 0 and errors > 0:
@@ -1402,48 +895,137 @@ def upload():
                 flash(f"{success_msg}. ❌ {errors} Datei(en) hatten Probleme.")
         return redirect(url_for("index"))
 
-    return render_template_string(
-        UPLOAD_TMPL,
+    return TEMPLATES["upload"].render(
         title=TITLE, allowed=sorted(ALLOWED_EXT),
         max_mb=MAX_CONTENT_LENGTH // (1024*1024),
         upload_code_required=bool(UPLOAD_CODE),
         public_url=PUBLIC_BASE_URL
     )
 
+def send_upload(filename: str):
+    # Hinter nginx übernimmt der Proxy die Auslieferung per sendfile(2)
+    if X_ACCEL_UPLOADS:
+        path = safe_join(str(UPLOAD_DIR), filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        resp = make_response("")
+        resp.headers["X-Accel-Redirect"] = X_ACCEL_UPLOADS.rstrip("/") + "/" + quote(filename)
+        resp.headers["Content-Type"] = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        return resp
+    return send_from_directory(UPLOAD_DIR, filename, conditional=True)
+
 @app.route("/uploads/<path:filename>")
 def file_raw(filename):
-    return send_from_directory(UPLOAD_DIR, filename, conditional=True)
+    resp = send_upload(filename)
+    # ULID-Namen werden nie wiederverwendet, der Inhalt ändert sich nie
+    resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return resp
+
+# Originale zu einem Thumbnail-Namen: exakte Namen statt LIKE, damit der UNIQUE-Index greift
+ORIGINAL_LOOKUP = (
+    "SELECT filename FROM media WHERE filename IN ("
+    + ", ".join("?" * len(ALLOWED_EXT)) + ") LIMIT 1"
+)
 
 @app.route("/thumbs/<path:thumb>")
 def thumb_raw(thumb):
-    return send_from_directory(THUMB_DIR, thumb, conditional=True)
+    if not (THUMB_DIR / thumb).is_file():
+        # Thumbnail noch nicht fertig: sofort das Original ausliefern statt zu warten
+        stem = _stem(thumb)
+        with db() as con:
+            row = con.execute(
+                ORIGINAL_LOOKUP, [f"{stem}.{ext}" for ext in sorted(ALLOWED_EXT)]
+            ).fetchone()
+        if row:
+            resp = send_upload(row["filename"])
+            resp.headers["Cache-Control"] = "no-store"
+            return resp
+    resp = send_upload("thumbs/" + thumb)
+    resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return resp
 
-@app.route("/qr.png")
-def qr_png():
-    base = PUBLIC_BASE_URL.rstrip("/") if PUBLIC_BASE_URL else request.url_root.rstrip("/")
-    target = base + url_for("upload")
-    img = qrcode.make(target)
+def _render_qr(target: str, kind: str = "png", **options) -> bytes:
+    # segno schreibt PNG (1 Bit) und SVG selbst, ganz ohne Pillow; make_qr nie als
+    # Micro-QR, den die meisten Handykameras nicht lesen
     buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    buf.seek(0)
-    resp = make_response(buf.read())
-    resp.headers["Content-Type"] = "image/png"
-    resp.headers["Cache-Control"] = "no-store"
+    segno.make_qr(target, error="l").save(buf, kind=kind, scale=10, border=4, **options)
+    return buf.getvalue()
+
+def _render_qr_svg(target: str) -> bytes:
+    return _render_qr(target, "svg", light="#fff", xmldecl=False, nl=False)
+
+@app.route("/t/<thumb_hash>.webp")
+def thumb_hashed(thumb_hash):
+    resp = send_upload(f"thumbs/{thumb_hash}.webp")
+    resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
     return resp
 
+# (Format, Basis-URL) -> (Bytes, ETag). Ohne PUBLIC_BASE_URL bestimmt der Host-Header
+# des Clients die Basis, daher begrenzt statt mit jedem Hostnamen zu wachsen
+@lru_cache(maxsize=8)
+def _cached_qr(fmt: str, render, base: str) -> tuple:
+    data = render(base + url_for("upload"))
+    return data, hashlib.blake2b(data, digest_size=8).hexdigest()
+
+def _qr_response(fmt: str, mimetype: str, render) -> Response:
+    base = PUBLIC_BASE_URL.rstrip("/") if PUBLIC_BASE_URL else request.url_root.rstrip("/")
+    data, etag = _cached_qr(fmt, render, base)
+    resp = make_response(data)
+    resp.headers["Content-Type"] = mimetype
+    resp.headers["Cache-Control"] = "public, max-age=86400, immutable"
+    resp.set_etag(etag)
+    return resp.make_conditional(request)
+
+@app.route("/qr.png")
+def qr_png():
+    return _qr_response("png", "image/png", _render_qr)
+
+@app.route("/qr.svg")
+def qr_svg():
+    return _qr_response("svg", "image/svg+xml", _render_qr_svg)
+
+def json_bytes(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
 @app.route("/api/list")
 def api_list():
-    with db() as con:
-        rows = con.execute("SELECT filename, orig_name, created_at FROM media ORDER BY id DESC").fetchall()
-    return jsonify([
-        {
-            "filename": r["filename"],
-            "url": url_for("file_raw", filename=r["filename"], _external=True),
-            "thumb": url_for("thumb_raw", thumb=pathlib.Path(r["filename"]).stem + ".webp", _external=True),
-            "orig_name": r["orig_name"],
-            "created_at": r["created_at"]
-        } for r in rows
-    ])
+    # Ohne Parameter kommt wie bisher die ganze Liste, sonst eine Seite ab ?before=
+    before = request.args.get("before", type=int)
+    limit = request.args.get("limit", type=int)
+    # -1 heißt für SQLite "ohne Grenze": nur ohne ?limit= erlaubt, nicht per negativem Wert
+    limit = -1 if limit is None else max(1, min(limit, 500))
+
+    file_head, file_tail = _url_parts("file_raw", "filename", _external=True)
+    thumb_head, thumb_tail = _url_parts("thumb_raw", "thumb", _external=True)
+    hashed_head, hashed_tail = _url_parts("thumb_hashed", "thumb_hash", _external=True)
+
+    def generate():
+        # Array stapelweise ausgeben, ohne die ganze Liste im Speicher aufzubauen
+        separator = b"["
+        with db() as con:
+            cur = tuple_cursor(con).execute(
+                "SELECT id, filename, orig_name, created_at, thumb_hash FROM media "
+                + gallery_where(before) + " ORDER BY id DESC LIMIT ?",
+                gallery_params(before, limit)
+            )
+            while rows := cur.fetchmany(256):
+                yield separator + b",".join(
+                    json_bytes({
+                        "id": media_id,
+                        "filename": filename,
+                        "url": file_head + quote(filename) + file_tail,
+                        "thumb": (hashed_head + quote(thumb_hash) + hashed_tail if thumb_hash
+                                  else thumb_head + quote(_stem(filename) + ".webp") + thumb_tail),
+                        "orig_name": orig_name,
+                        "created_at": created_at
+                    }) for media_id, filename, orig_name, created_at, thumb_hash in rows
+                )
+                separator = b","
+        yield b"]" if separator == b"," else b"[]"
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
 
 @app.route("/admin/delete", methods=["POST"])
 def delete_file():
@@ -1453,19 +1035,46 @@ def delete_file():
     filename = request.form.get("filename", "")
     if not filename:
         abort(400)
-    f = UPLOAD_DIR / filename
-    t = THUMB_DIR / (pathlib.Path(filename).stem + ".webp")
+    paths = [UPLOAD_DIR / filename, THUMB_DIR / (_stem(filename) + ".webp")]
     with db() as con:
-        con.execute("DELETE FROM media WHERE filename = ?", (filename,))
-    if f.exists():
-        f.unlink()
-    if t.exists():
-        t.unlink()
+        # Zeile und Dateien gemeinsam: scheitert ein unlink, macht das Rollback die
+        # Zeile wieder sichtbar und ein erneuter Versuch räumt den Rest ab
+        con.execute("BEGIN")
+        row = con.execute("DELETE FROM media WHERE filename = ? RETURNING thumb_hash", (filename,)).fetchone()
+        thumb_hash = row["thumb_hash"] if row else None
+        # Identische Fotos teilen sich die Hash-Datei
+        if thumb_hash and not con.execute(
+            "SELECT 1 FROM media WHERE thumb_hash = ? LIMIT 1", (thumb_hash,)
+        ).fetchone():
+            paths.append(THUMB_DIR / f"{thumb_hash}.webp")
+        # Ein unlink statt exists() + unlink: ein Systemaufruf pro Datei
+        for path in paths:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
     return redirect(url_for("index", admin=ADMIN_TOKEN))
 
+@app.route("/assets/<path:filename>")
+def asset(filename):
+    variants = ASSETS.get(filename)
+    if variants is None:
+        abort(404)
+    encoding = next(
+        (enc for enc in ("br", "gzip") if enc in variants and enc in request.accept_encodings),
+        "identity"
+    )
+    resp = make_response(variants[encoding])
+    resp.headers["Content-Type"] = variants["mimetype"]
+    if encoding != "identity":
+        resp.headers["Content-Encoding"] = encoding
+    resp.headers["Vary"] = "Accept-Encoding"
+    resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return resp
+
 @app.route("/static/<path:filename>")
 def static_files(filename):
-    return send_from_directory(BASE_DIR / "static", filename)
+    return send_from_directory(STATIC_DIR, filename)
 
 @app.route("/favicon.ico")
 def favicon():
@@ -1476,6 +1085,14 @@ def healthz():
     return "ok"
 
 # -------------------- Start --------------------
+requeue_thumbs()
+
+if PUBLIC_BASE_URL:
+    # Ziel steht fest: QR-Codes schon beim Import rendern, nicht beim ersten Aufruf
+    with app.test_request_context():
+        _cached_qr("png", _render_qr, PUBLIC_BASE_URL.rstrip("/"))
+        _cached_qr("svg", _render_qr_svg, PUBLIC_BASE_URL.rstrip("/"))
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "8000"))
     host = os.getenv("HOST", "0.0.0.0")
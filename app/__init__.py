@@ -1,5 +1,5 @@
 from flask import Flask
-from jinja2 import ChoiceLoader, DictLoader
+from jinja2 import ChoiceLoader, DictLoader, FileSystemBytecodeCache
 
 from config import config
 
@@ -12,9 +12,15 @@ def create_app(config_name='default'):
     app.config.from_object(config[config_name])
     config[config_name].init_directories()
     
-    # Initialize database
-    from app.models.database import init_db
-    init_db()
+    # Initialize database; the connection lives on g and is closed with the app context
+    from app.models.database import init_db, close_db
+    app.teardown_appcontext(close_db)
+    with app.app_context():
+        init_db()
+    
+    # Thumbnails are created after the upload request has returned
+    from app.utils.thumb_queue import init_thumb_pool
+    init_thumb_pool(app)
     
     # Register blueprints
     from app.routes.main import main_bp
@@ -25,11 +31,23 @@ def create_app(config_name='default'):
     app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(admin_bp, url_prefix='/admin')
     
+    # QR codes only depend on the public URL, render them before the first request
+    from app.utils.qr_utils import prerender_qr_codes
+    prerender_qr_codes(app)
+    
     # Setup templates
     from app.templates.base import BASE_TEMPLATE
     app.jinja_loader = ChoiceLoader([
         app.jinja_loader,
         DictLoader({"base.html": BASE_TEMPLATE})
     ])
+    app.jinja_env.auto_reload = app.config["TEMPLATES_AUTO_RELOAD"]
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory=str(app.config["JINJA_CACHE_DIR"]))
+    
+    # Precompressed CSS/JS for gzip_static/brotli_static in the reverse proxy
+    from app.utils.static_utils import build_token, precompress_static
+    precompress_static(app.static_folder)
+    # Hash the deployed files once now instead of on the first gallery request
+    build_token()
     
     return app
\ No newline at end of file
@@ -1,107 +1,333 @@
 import sqlite3
-from typing import List, Dict, Any, Optional
+import time
+from functools import lru_cache
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from pathlib import Path
 from datetime import datetime
-from contextlib import contextmanager
+
+from flask import g
 
 from config import Config
 
 
-@contextmanager
-def get_db_connection():
-    """Context manager for database connections."""
-    conn = sqlite3.connect(Config.DB_PATH)
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-    finally:
+# Per-connection settings; applied once when the connection is opened
+CONNECTION_PRAGMAS = """
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA mmap_size=134217728;
+PRAGMA cache_spill=OFF;
+"""
+
+# Gallery version counter: the triggers bump it on every change to media, so it only
+# ever moves forward. MAX()/COUNT() aggregates can repeat after a delete and an upload.
+GALLERY_VERSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS gallery_version (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO gallery_version (id, version) VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS media_version_insert AFTER INSERT ON media
+BEGIN UPDATE gallery_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS media_version_update AFTER UPDATE ON media
+BEGIN UPDATE gallery_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS media_version_delete AFTER DELETE ON media
+BEGIN UPDATE gallery_version SET version = version + 1; END;
+"""
+
+# Thumbnail jobs claim their record first, so several worker processes that all
+# requeue the missing thumbnails at startup do not render the same photo. Kept
+# apart from media so claims do not bump the gallery version. A claim left by
+# a crashed process expires after THUMB_CLAIM_TIMEOUT seconds.
+THUMB_CLAIMS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS thumb_claims (
+    filename TEXT PRIMARY KEY,
+    claimed_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+THUMB_CLAIM_TIMEOUT = 600
+
+# Filenames per DELETE statement in delete_media_bulk
+DELETE_BATCH_SIZE = 500
+
+
+def get_db() -> sqlite3.Connection:
+    """
+    Return the database connection of the current app context.
+    
+    The connection is opened on first use and shared by every repository call
+    until the context is torn down. It runs in autocommit mode.
+    """
+    conn = g.get("_db")
+    if conn is None:
+        conn = sqlite3.connect(Config.DB_PATH, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.executescript(CONNECTION_PRAGMAS)
+        g._db = conn
+    return conn
+
+
+def close_db(exception: Optional[BaseException] = None):
+    """Close the connection of the current app context, if one was opened."""
+    conn = g.pop("_db", None)
+    if conn is not None:
         conn.close()
 
 
 def init_db():
     """Initialize the database with required tables."""
-    with get_db_connection() as conn:
-        conn.execute("""
-        CREATE TABLE IF NOT EXISTS media (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            filename TEXT UNIQUE NOT NULL,
-            orig_name TEXT NOT NULL,
-            uploader_ip TEXT,
-            created_at TEXT NOT NULL,
-            file_size INTEGER,
-            file_type TEXT
+    conn = get_db()
+    
+    # WAL is stored in the database file, so setting it once is enough.
+    # Gallery reads no longer block on an upload that is being written.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS media (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        filename TEXT UNIQUE NOT NULL,
+        orig_name TEXT NOT NULL,
+        uploader_ip TEXT,
+        created_at TEXT NOT NULL,
+        file_size INTEGER,
+        file_type TEXT,
+        thumb TEXT
+    )
+    """)
+    
+    # Databases created before the thumb column need it added and filled once.
+    # Afterwards NULL means the thumbnail is still being created.
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(media)")}
+    if "thumb" not in columns:
+        conn.execute("ALTER TABLE media ADD COLUMN thumb TEXT")
+        conn.executemany(
+            "UPDATE media SET thumb = ? WHERE id = ?",
+            [
+                (Path(row["filename"]).stem + ".webp", row["id"])
+                for row in conn.execute("SELECT id, filename FROM media").fetchall()
+            ]
         )
-        """)
-        conn.commit()
+    
+    # Gallery pages are served from this index alone, without touching the table
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_media_cover
+        ON media(id DESC, filename, orig_name, created_at, thumb)
+    """)
+    
+    # Basis of the gallery fingerprint
+    conn.executescript(GALLERY_VERSION_SCHEMA)
+    conn.executescript(THUMB_CLAIMS_SCHEMA)
+
+
+def _tuple_cursor() -> sqlite3.Cursor:
+    """Cursor that returns plain tuples, for hot loops that unpack rows positionally."""
+    cursor = get_db().cursor()
+    cursor.row_factory = None
+    return cursor
+
+
+def _before_clause(before_id: Optional[int]) -> Tuple[str, tuple]:
+    """WHERE clause for keyset pagination ('? IS NULL OR id < ?' would defeat the index seek)."""
+    if before_id is None:
+        return "", ()
+    return "WHERE id < ?", (before_id,)
+
+
+# Any upload or delete changes the fingerprint, so entries never go stale;
+# old versions simply fall out of the cache. The database path is part of the
+# key, fingerprints of different databases can be equal.
+@lru_cache(maxsize=64)
+def _get_page_cached(db_path: str, fingerprint: str, before_id: Optional[int],
+                     limit: int) -> List[Dict[str, Any]]:
+    """Build one gallery page for one version of the media table."""
+    where, params = _before_clause(before_id)
+    rows = _tuple_cursor().execute(
+        f"""SELECT id, filename, thumb, orig_name, substr(replace(created_at, 'T', ' '), 1, 19)
+            FROM media {where} ORDER BY id DESC LIMIT ?""",
+        (*params, limit)
+    )
+    
+    return [
+        {
+            "id": media_id,
+            "filename": filename,
+            "thumb": thumb,
+            "orig_name": orig_name,
+            "created_at": created_at
+        }
+        for media_id, filename, thumb, orig_name, created_at in rows
+    ]
 
 
 class MediaRepository:
     """Repository class for media operations."""
     
     @staticmethod
-    def create_media(filename: str, orig_name: str, uploader_ip: str, 
-                    file_size: Optional[int] = None, file_type: Optional[str] = None) -> bool:
-        """Create a new media record."""
+    def create_media_bulk(rows: List[Tuple[str, str, str, Optional[int], Optional[str], str]]) -> bool:
+        """
+        Create several media records in a single transaction (one commit for the whole batch).
+        
+        Each row is (filename, orig_name, uploader_ip, file_size, file_type, thumb).
+        """
+        created_at = datetime.utcnow().isoformat()
+        conn = get_db()
         try:
-            with get_db_connection() as conn:
-                conn.execute(
-                    """INSERT OR IGNORE INTO media 
-                       (filename, orig_name, uploader_ip, created_at, file_size, file_type) 
-                       VALUES (?, ?, ?, ?, ?, ?)""",
-                    (filename, orig_name, uploader_ip, datetime.utcnow().isoformat(), 
-                     file_size, file_type)
-                )
-                conn.commit()
-                return True
+            conn.execute("BEGIN")
+            conn.executemany(
+                """INSERT OR IGNORE INTO media 
+                   (filename, orig_name, uploader_ip, created_at, file_size, file_type, thumb) 
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                [
+                    (filename, orig_name, uploader_ip, created_at, file_size, file_type, thumb)
+                    for filename, orig_name, uploader_ip, file_size, file_type, thumb in rows
+                ]
+            )
+            conn.execute("COMMIT")
+            return True
         except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
             return False
     
     @staticmethod
-    def get_all_media() -> List[Dict[str, Any]]:
-        """Get all media records ordered by creation date (newest first)."""
-        with get_db_connection() as conn:
-            rows = conn.execute(
-                "SELECT filename, orig_name, created_at, file_size, file_type FROM media ORDER BY id DESC"
-            ).fetchall()
-            
-            return [
-                {
-                    "filename": row["filename"],
-                    "thumb": Path(row["filename"]).stem + ".webp",
-                    "orig_name": row["orig_name"],
-                    "created_at": row["created_at"].replace("T", " ")[:19],
-                    "file_size": row["file_size"],
-                    "file_type": row["file_type"]
-                }
-                for row in rows
-            ]
+    def set_thumb(filename: str, thumb: str) -> bool:
+        """Record the finished thumbnail of a media record; False if the record is gone."""
+        try:
+            cursor = get_db().execute("UPDATE media SET thumb = ? WHERE filename = ?", (thumb, filename))
+            return cursor.rowcount > 0
+        except sqlite3.Error:
+            return False
+    
+    @staticmethod
+    def claim_thumbnail(filename: str) -> bool:
+        """
+        Claim a media record whose thumbnail is still missing for the calling job.
+        
+        False if the record is gone, already has its thumbnail, or another
+        job holds a claim that has not expired yet.
+        """
+        now = time.time()
+        try:
+            cursor = get_db().execute(
+                """INSERT INTO thumb_claims (filename, claimed_at)
+                   SELECT filename, ? FROM media WHERE filename = ? AND thumb IS NULL
+                   ON CONFLICT (filename) DO UPDATE SET claimed_at = excluded.claimed_at
+                   WHERE thumb_claims.claimed_at < ?""",
+                (now, filename, now - THUMB_CLAIM_TIMEOUT)
+            )
+            return cursor.rowcount > 0
+        except sqlite3.Error:
+            return False
+    
+    @staticmethod
+    def release_thumbnail(filename: str):
+        """Drop the claim of a finished or failed thumbnail job."""
+        try:
+            get_db().execute("DELETE FROM thumb_claims WHERE filename = ?", (filename,))
+        except sqlite3.Error:
+            pass
+    
+    @staticmethod
+    def get_missing_thumbnails() -> List[str]:
+        """Get the filenames of media records whose thumbnail has not been created yet."""
+        rows = _tuple_cursor().execute("SELECT filename FROM media WHERE thumb IS NULL").fetchall()
+        return [filename for filename, in rows]
+    
+    @staticmethod
+    def get_page(before_id: Optional[int] = None, limit: int = 60) -> List[Dict[str, Any]]:
+        """
+        Get one gallery page (newest first) of media older than before_id.
+        
+        Keyset pagination: the page is read straight from idx_media_cover
+        no matter how deep into the gallery it is. The result is cached per
+        gallery fingerprint and shared between requests; do not modify it.
+        """
+        return _get_page_cached(str(Config.DB_PATH), MediaRepository.get_fingerprint(), before_id, limit)
+    
+    @staticmethod
+    def iter_media(before_id: Optional[int] = None, limit: int = -1,
+                   batch_size: int = 256) -> Iterator[List[Tuple]]:
+        """
+        Yield media rows (newest first) in batches without loading the whole table.
+        
+        Rows are plain tuples of (id, filename, thumb, orig_name, created_at, file_size, file_type).
+        A negative limit returns every row older than before_id.
+        """
+        where, params = _before_clause(before_id)
+        cursor = _tuple_cursor()
+        cursor.execute(
+            f"""SELECT id, filename, thumb, orig_name,
+                       substr(replace(created_at, 'T', ' '), 1, 19) AS created_at, file_size, file_type
+                FROM media {where} ORDER BY id DESC LIMIT ?""",
+            (*params, limit)
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
     
     @staticmethod
     def delete_media(filename: str) -> bool:
         """Delete a media record by filename."""
         try:
-            with get_db_connection() as conn:
-                conn.execute("DELETE FROM media WHERE filename = ?", (filename,))
-                conn.commit()
-                return True
+            get_db().execute("DELETE FROM media WHERE filename = ?", (filename,))
+            return True
         except sqlite3.Error:
             return False
     
+    @staticmethod
+    def delete_media_bulk(filenames: List[str]) -> List[Tuple[str, Optional[str]]]:
+        """
+        Delete several media records in a single transaction.
+        
+        Returns the (filename, thumb) pairs that were deleted, so their files can be
+        removed without looking the records up first; empty on error.
+        """
+        conn = get_db()
+        cursor = _tuple_cursor()
+        deleted = []
+        try:
+            conn.execute("BEGIN")
+            # Stay well below SQLite's limit on bound parameters
+            for start in range(0, len(filenames), DELETE_BATCH_SIZE):
+                batch = filenames[start:start + DELETE_BATCH_SIZE]
+                placeholders = ", ".join("?" * len(batch))
+                deleted += cursor.execute(
+                    f"DELETE FROM media WHERE filename IN ({placeholders}) RETURNING filename, thumb",
+                    batch
+                ).fetchall()
+            conn.execute("COMMIT")
+            return deleted
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            return []
+    
     @staticmethod
     def get_media_by_filename(filename: str) -> Optional[Dict[str, Any]]:
         """Get a specific media record by filename."""
-        with get_db_connection() as conn:
-            row = conn.execute(
-                "SELECT * FROM media WHERE filename = ?", (filename,)
-            ).fetchone()
-            
-            if row:
-                return dict(row)
-            return None
+        row = get_db().execute(
+            "SELECT * FROM media WHERE filename = ?", (filename,)
+        ).fetchone()
+        
+        if row:
+            return dict(row)
+        return None
+    
+    @staticmethod
+    def get_fingerprint() -> str:
+        """
+        Get a cheap fingerprint of the gallery contents, usable as an ETag.
+        
+        The version counter is raised by triggers on every insert, delete and
+        update of media, including finished background thumbnails.
+        """
+        return str(get_db().execute("SELECT version FROM gallery_version").fetchone()[0])
     
     @staticmethod
     def get_media_count() -> int:
         """Get total count of media records."""
-        with get_db_connection() as conn:
-            result = conn.execute("SELECT COUNT(*) FROM media").fetchone()
-            return result[0] if result else 0
\ No newline at end of file
+        result = get_db().execute("SELECT COUNT(*) FROM media").fetchone()
+        return result[0] if result else 0
\ No newline at end of file
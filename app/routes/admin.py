@@ -1,28 +1,29 @@
 from flask import Blueprint, request, redirect, url_for, abort
 
 from app.models.database import MediaRepository
-from app.utils.file_utils import delete_file_and_thumbnail
+from app.utils.file_utils import delete_many
 from config import Config
 
 
 admin_bp = Blueprint('admin', __name__)
 
-
 @admin_bp.route("/delete", methods=["POST"])
 def delete_file():
-    """Admin endpoint to delete a file."""
+    """Admin endpoint to delete one or more files."""
     # Verify admin token
     token = request.form.get("admin_token", "")
     if token != Config.ADMIN_TOKEN:
         abort(403)
     
-    filename = request.form.get("filename", "")
-    if not filename:
+    # Several filename fields delete a whole selection in one request
+    filenames = [name for name in request.form.getlist("filename") if name]
+    if not filenames:
         abort(400)
     
-    # Delete from database
-    if MediaRepository.delete_media(filename):
-        # Delete files from filesystem
-        delete_file_and_thumbnail(filename)
+    # RETURNING hands back the thumbnail names, which carry a content hash
+    deleted = MediaRepository.delete_media_bulk(filenames)
+    
+    # Delete files from filesystem
+    delete_many(deleted)
     
     return redirect(url_for("main.index", admin=Config.ADMIN_TOKEN))
\ No newline at end of file
@@ -1,30 +1,66 @@
-from flask import Blueprint, jsonify, url_for
-from pathlib import Path
+import json
+from urllib.parse import quote
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context, url_for
 
 from app.models.database import MediaRepository
 
+try:
+    import orjson  # optional, faster than the stdlib encoder
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj) -> bytes:
+    """Serialize obj to JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
 
 api_bp = Blueprint('api', __name__)
 
+MAX_PAGE_SIZE = 500
+
 
 @api_bp.route("/list")
 def list_media():
-    """API endpoint to list all media files."""
-    media_items = MediaRepository.get_all_media()
+    """
+    API endpoint to list media files, newest first.
+    
+    Without parameters every file is listed; ?before=<id>&limit=<n> returns one page.
+    """
+    before = request.args.get("before", type=int)
+    limit = request.args.get("limit", type=int)
+    # A negative limit means "every row" to SQLite; only an absent ?limit= may ask for that
+    limit = -1 if limit is None else max(1, min(limit, MAX_PAGE_SIZE))
+    
+    # Resolve the URL prefixes once instead of walking the URL map twice per row
+    file_prefix = url_for("main.file_raw", filename="_", _external=True)[:-1]
+    thumb_prefix = url_for("main.thumb_raw", thumb="_", _external=True)[:-1]
     
-    response_data = []
-    for item in media_items:
-        response_data.append({
-            "filename": item["filename"],
-            "url": url_for("main.file_raw", filename=item["filename"], _external=True),
-            "thumb": url_for("main.thumb_raw", thumb=item["thumb"], _external=True),
-            "orig_name": item["orig_name"],
-            "created_at": item["created_at"],
-            "file_size": item.get("file_size"),
-            "file_type": item.get("file_type")
-        })
+    def generate():
+        # Emit the array batch by batch so memory stays flat for large galleries
+        separator = b"["
+        for rows in MediaRepository.iter_media(before, limit):
+            yield separator + b",".join(
+                _dumps({
+                    "id": media_id,
+                    "filename": filename,
+                    "url": file_prefix + quote(filename),
+                    # Pending thumbnails fall back to the original, like the gallery
+                    "thumb": thumb_prefix + quote(thumb) if thumb else file_prefix + quote(filename),
+                    "orig_name": orig_name,
+                    "created_at": created_at,
+                    "file_size": file_size,
+                    "file_type": file_type
+                })
+                for media_id, filename, thumb, orig_name, created_at, file_size, file_type in rows
+            )
+            separator = b","
+        yield b"]" if separator == b"," else b"[]"
     
-    return jsonify(response_data)
+    return Response(stream_with_context(generate()), mimetype="application/json")
 
 
 @api_bp.route("/stats")
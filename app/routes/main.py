@@ -1,80 +1,151 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_from_directory, current_app
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import quote
+
+from flask import (
+    Blueprint, abort, render_template, request, redirect, url_for, flash,
+    send_from_directory, make_response, session
+)
+from werkzeug.security import safe_join
 
 from app.models.database import MediaRepository
-from app.utils.file_utils import save_uploaded_file, is_allowed_file
-from app.utils.qr_utils import generate_qr_code_response
+from app.utils.file_utils import (
+    save_uploaded_file, save_streamed_file, delete_file_and_thumbnail, get_file_extension
+)
+from app.utils.qr_utils import generate_qr_code_response, generate_qr_svg_response
+from app.utils.static_utils import build_token
+from app.utils.thumb_queue import schedule_thumbnails
 from config import Config
 
+try:
+    from app.utils.upload_stream import parse_upload_stream
+except ImportError:  # streaming-form-data is optional
+    parse_upload_stream = None
+
 
 main_bp = Blueprint('main', __name__)
 
+# Uploads and thumbnails never change under their name, so browsers may keep them
+IMMUTABLE_ENDPOINTS = frozenset({"main.file_raw", "main.thumb_raw"})
+
 
 @main_bp.route("/")
 def index():
     """Main gallery page."""
     admin = request.args.get("admin")
-    items = MediaRepository.get_all_media()
+    before = request.args.get("before", type=int)
+    page_size = Config.GALLERY_PAGE_SIZE
     
-    return render_template(
-        "index.html",
-        items=items,
-        admin=admin if admin == Config.ADMIN_TOKEN else None,
-        config=Config
-    )
+    # Unchanged gallery: answer a revalidation without querying rows or rendering.
+    # Pending flash messages must be shown, so those requests always render.
+    fingerprint = MediaRepository.get_fingerprint()
+    # The build token invalidates pages after a deploy changed templates or assets
+    etag = f"{fingerprint}-{build_token()}"
+    if "_flashes" not in session and request.if_none_match.contains_weak(etag):
+        response = make_response("", 304)
+    else:
+        # One extra row tells whether a further page exists
+        items = MediaRepository.get_page(before, page_size + 1)
+        next_before = items[page_size - 1]["id"] if len(items) > page_size else None
+        
+        response = make_response(render_template(
+            "index.html",
+            items=items[:page_size],
+            next_before=next_before,
+            # Resolved once here instead of two url_for calls per card in the template
+            file_prefix=url_for("main.file_raw", filename="_")[:-1],
+            thumb_prefix=url_for("main.thumb_raw", thumb="_")[:-1],
+            admin=admin if admin == Config.ADMIN_TOKEN else None,
+            config=Config
+        ))
+    
+    response.set_etag(etag, weak=True)
+    response.cache_control.max_age = 0
+    response.cache_control.must_revalidate = True
+    return response
 
 
 @main_bp.route("/upload", methods=["GET", "POST"])
 def upload():
     """Upload page for handling file uploads."""
     if request.method == "POST":
+        uploader_ip = request.remote_addr or ""
+        
+        if parse_upload_stream is not None and request.mimetype == "multipart/form-data":
+            # Stream file parts straight to disk instead of spooling them in Werkzeug.
+            # The request body can only be read once, so there is no fallback after this.
+            try:
+                code, streamed = parse_upload_stream(request.stream, request.headers)
+            except Exception:
+                flash("Upload fehlgeschlagen.")
+                return redirect(url_for("main.upload"))
+            uploads = [
+                (f.filename, f.size, partial(save_streamed_file, f.path, f.filename), f.path)
+                for f in streamed
+            ]
+        else:
+            code = request.form.get("code")
+            uploads = [
+                (f.filename, f.content_length, partial(save_uploaded_file, f, uploader_ip), None)
+                for f in request.files.getlist("files")
+                if f and f.filename
+            ]
+        
         # Check upload code if required
-        if Config.UPLOAD_CODE and request.form.get("code") != Config.UPLOAD_CODE:
+        if Config.UPLOAD_CODE and code != Config.UPLOAD_CODE:
+            _discard_streamed(uploads)
             flash("Falscher Code.")
             return redirect(url_for("main.upload"))
 
-        files = request.files.getlist("files")
-        if not files or all(not f.filename for f in files):
+        if not uploads:
             flash("Keine Dateien ausgewählt.")
             return redirect(url_for("main.upload"))
 
         saved_count = 0
         error_count = 0
         error_details = []
+        accepted = []
+        pending = []
         
-        for file_storage in files:
-            if not file_storage or not file_storage.filename:
-                continue
-            
+        for orig_name, size, save, tmp_path in uploads:
             # Check file size before processing
-            if hasattr(file_storage, 'content_length') and file_storage.content_length:
-                if file_storage.content_length > Config.MAX_CONTENT_LENGTH:
-                    error_count += 1
-                    size_mb = file_storage.content_length / (1024 * 1024)
-                    error_details.append(f"'{file_storage.filename}': Datei zu groß ({size_mb:.1f} MB)")
-                    continue
-            
-            # Save file and get result
-            filename, error_msg = save_uploaded_file(file_storage, request.remote_addr or "")
-            
-            if error_msg:
+            if size and size > Config.MAX_CONTENT_LENGTH:
                 error_count += 1
-                error_details.append(f"'{file_storage.filename}': {error_msg}")
-            else:
-                # Save to database
-                file_size = getattr(file_storage, 'content_length', None)
-                file_type = file_storage.filename.rsplit('.', 1)[-1].lower() if '.' in file_storage.filename else None
+                size_mb = size / (1024 * 1024)
+                error_details.append(f"'{orig_name}': Datei zu groß ({size_mb:.1f} MB)")
+                if tmp_path is not None:
+                    tmp_path.unlink(missing_ok=True)
+                continue
+            accepted.append((orig_name, size, save))
+        
+        # Only the files are written here, in parallel; thumbnails are created in the background
+        if accepted:
+            with ThreadPoolExecutor(max_workers=min(Config.UPLOAD_WORKERS, len(accepted))) as executor:
+                futures = [executor.submit(save) for _, _, save in accepted]
+            
+            for (orig_name, size, _), future in zip(accepted, futures):
+                filename, error_msg = future.result()
                 
-                if MediaRepository.create_media(
-                    filename=filename,
-                    orig_name=file_storage.filename,
-                    uploader_ip=request.remote_addr or "",
-                    file_size=file_size,
-                    file_type=file_type
-                ):
-                    saved_count += 1
+                if error_msg:
+                    error_count += 1
+                    error_details.append(f"'{orig_name}': {error_msg}")
                 else:
+                    file_type = get_file_extension(orig_name) or None
+                    pending.append((filename, orig_name, uploader_ip, size, file_type, None))
+        
+        # Save to database, one transaction for the whole batch
+        if pending:
+            if MediaRepository.create_media_bulk(pending):
+                saved_count = len(pending)
+                # Queued only now: the job records the thumbnail on the existing row
+                schedule_thumbnails(filename for filename, *_ in pending)
+            else:
+                for filename, orig_name, *_ in pending:
+                    delete_file_and_thumbnail(filename)
                     error_count += 1
-                    error_details.append(f"'{file_storage.filename}': Datenbankfehler")
+                    error_details.append(f"'{orig_name}': Datenbankfehler")
 
         # Generate user feedback
         _generate_upload_feedback(saved_count, error_count, error_details)
@@ -87,6 +158,13 @@ def upload():
     )
 
 
+def _discard_streamed(uploads: list):
+    """Remove files that were already streamed to disk but will not be saved."""
+    for _, _, _, tmp_path in uploads:
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+
+
 def _generate_upload_feedback(saved: int, errors: int, error_details: list):
     """Generate appropriate flash message based on upload results."""
     if saved == 0 and errors > 0:
@@ -107,13 +185,41 @@ def _generate_upload_feedback(saved: int, errors: int, error_details: list):
 @main_bp.route("/uploads/<path:filename>")
 def file_raw(filename):
     """Serve uploaded files."""
-    return send_from_directory(Config.UPLOAD_DIR, filename, conditional=True)
+    return _send_media(Config.UPLOAD_DIR, filename)
 
 
 @main_bp.route("/thumbs/<path:thumb>")
 def thumb_raw(thumb):
     """Serve thumbnail files."""
-    return send_from_directory(Config.THUMB_DIR, thumb, conditional=True)
+    return _send_media(Config.THUMB_DIR, thumb, "thumbs/")
+
+
+def _send_media(directory, filename: str, accel_subdir: str = ""):
+    """
+    Send a file below UPLOAD_DIR.
+    
+    With X_ACCEL_UPLOADS set, nginx sends the file itself via X-Accel-Redirect.
+    Otherwise send_from_directory is used, which emits X-Sendfile when USE_X_SENDFILE is on.
+    """
+    if Config.X_ACCEL_UPLOADS:
+        path = safe_join(str(directory), filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        response = make_response("")
+        response.headers["X-Accel-Redirect"] = (
+            Config.X_ACCEL_UPLOADS.rstrip("/") + "/" + quote(accel_subdir + filename)
+        )
+        response.headers["Content-Type"] = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        return response
+    return send_from_directory(directory, filename, conditional=True)
+
+
+@main_bp.after_request
+def _cache_media(response):
+    """Let clients cache photos and thumbnails for a year without revalidating."""
+    if request.endpoint in IMMUTABLE_ENDPOINTS and response.status_code in (200, 304):
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
 
 
 @main_bp.route("/qr.png")
@@ -122,6 +228,12 @@ def qr_png():
     return generate_qr_code_response('main.upload')
 
 
+@main_bp.route("/qr.svg")
+def qr_svg():
+    """Generate and serve QR code as SVG."""
+    return generate_qr_svg_response('main.upload')
+
+
 @main_bp.route("/static/<path:filename>")
 def static_files(filename):
     """Serve static files."""
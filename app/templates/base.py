@@ -19,7 +19,7 @@ BASE_TEMPLATE = """
           <div class="qr-container">
             <button class="qr-toggle" onclick="toggleQR()">QR Code</button>
             <div class="qr-dropdown" id="qrDropdown">
-              <img class="qr-code" alt="QR Code" src="{{ url_for('main.qr_png') }}">
+              <img class="qr-code" alt="QR Code" src="{{ url_for('main.qr_svg') }}">
               <div style="font-size: 0.8rem; color: var(--wedding-accent);">
                 {{ config.PUBLIC_BASE_URL or request.url_root.rstrip('/') }}
               </div>
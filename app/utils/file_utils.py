@@ -1,79 +1,208 @@
+import hashlib
+import io
+import os
 import secrets
+import shutil
 import pathlib
-from datetime import datetime
-from typing import Optional
-from PIL import Image, ExifTags
-from werkzeug.utils import secure_filename
+import time
+from typing import Iterable, Optional
+from PIL import Image
 from werkzeug.datastructures import FileStorage
 
 from config import Config
 
+try:
+    import pyvips  # optional, faster and leaner than Pillow for thumbnails
+except (ImportError, OSError):  # OSError: the libvips shared library is missing
+    pyvips = None
+
+
+# EXIF Orientation tag and the transpose that undoes each of its values.
+# transpose() only moves pixels, rotate(expand=True) runs an affine transform.
+_ORIENTATION_TAG = 0x0112
+_ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+# Copy uploads in 1 MiB blocks instead of Werkzeug's 16 KiB chunks
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Units for format_file_size
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")
+
+# Module-local so the upload hot path skips the class attribute lookups;
+# Config is read from the environment once at import anyway
+_ALLOWED = Config.ALLOWED_EXTENSIONS
+_UPLOAD_DIR = Config.UPLOAD_DIR
+_THUMB_DIR = Config.THUMB_DIR
+_THUMB_SIZE = Config.THUMB_SIZE
+_WEBP_QUALITY = Config.WEBP_QUALITY
+_WEBP_METHOD = Config.WEBP_METHOD
+
 
 def is_allowed_file(filename: str) -> bool:
     """Check if the file extension is allowed."""
-    if not filename or '.' not in filename:
-        return False
-    
-    ext = filename.rsplit('.', 1)[-1].lower()
-    return ext in Config.ALLOWED_EXTENSIONS
+    return split_allowed_extension(filename)[0]
+
+
+def get_file_extension(filename: str) -> str:
+    """Return the lower-case extension without the dot, or "" if there is none."""
+    _, sep, ext = filename.rpartition('.')
+    return ext.lower() if sep else ""
+
+
+def split_allowed_extension(filename: str) -> tuple[bool, str]:
+    """Parse the extension once and return (allowed, extension) for reuse by the caller."""
+    ext = get_file_extension(filename or "")
+    return ext in _ALLOWED, ext
 
 
 def autorotate_image(img: Image.Image) -> Image.Image:
     """Auto-rotate image based on EXIF orientation data."""
     try:
-        if hasattr(img, '_getexif'):
-            exif = img._getexif()
-            if exif:
-                orient_key = next((k for k, v in ExifTags.TAGS.items() if v == "Orientation"), None)
-                if orient_key:
-                    orientation = exif.get(orient_key)
-                    if orientation == 3:
-                        img = img.rotate(180, expand=True)
-                    elif orientation == 6:
-                        img = img.rotate(270, expand=True)
-                    elif orientation == 8:
-                        img = img.rotate(90, expand=True)
+        orientation = img.getexif().get(_ORIENTATION_TAG, 1)
     except Exception:
         # If EXIF processing fails, return original image
-        pass
-    return img
+        return img
+    
+    method = _ORIENTATION_TRANSPOSE.get(orientation)
+    return img.transpose(method) if method is not None else img
 
 
-def create_thumbnail(src_path: pathlib.Path, dst_path: pathlib.Path, 
-                    size: int = None) -> bool:
-    """Create a thumbnail from the source image."""
-    if size is None:
-        size = Config.THUMB_SIZE
+def encode_thumbnails(src_path: pathlib.Path, sizes: list[int]) -> list[bytes]:
+    """
+    Decode the source image once and encode a WebP thumbnail in memory for each size.
+    
+    Raises an exception if the image cannot be decoded or encoded.
+    """
+    # Largest first, every smaller size is derived from the same decoded image
+    order = sorted(range(len(sizes)), key=sizes.__getitem__, reverse=True)
+    max_size = sizes[order[0]]
+    encoded = [b""] * len(sizes)
+    
+    if pyvips is not None:
+        try:
+            # Shrink-on-load plus tiled processing: the full image is never held in memory.
+            # thumbnail() applies the EXIF orientation itself.
+            base = pyvips.Image.thumbnail(str(src_path), max_size, height=max_size, size="down")
+            for i in order:
+                size = sizes[i]
+                img = base if size == max_size else base.thumbnail_image(size, height=size, size="down")
+                encoded[i] = img.write_to_buffer(".webp", Q=_WEBP_QUALITY, strip=True)
+            return encoded
+        except pyvips.Error:
+            # Format without a libvips loader, fall back to Pillow
+            pass
     
+    with Image.open(src_path) as img:
+        if img.format == "JPEG":
+            # libjpeg-turbo shrink-on-load: decode straight to 1/2, 1/4 or 1/8 scale,
+            # keeping at least twice the target size so LANCZOS still has detail to work with
+            img.draft("RGB", (max_size * 2, max_size * 2))
+        img = autorotate_image(img)
+        img.load()
+        if img.mode == "RGBA" and img.getchannel("A").getextrema() == (255, 255):
+            # Fully opaque alpha channel: drop it, libwebp's alpha path is slower
+            img = img.convert("RGB")
+        for i in order:
+            # thumbnail() works in place, so each size starts from a copy of the decoded image
+            thumb = img.copy() if len(sizes) > 1 else img
+            thumb.thumbnail((sizes[i], sizes[i]), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            thumb.save(buffer, "WEBP", quality=_WEBP_QUALITY, method=_WEBP_METHOD)
+            encoded[i] = buffer.getvalue()
+    return encoded
+
+
+def link_original(src_path: pathlib.Path, dst_path: pathlib.Path) -> None:
+    """Use the original file as its own thumbnail."""
+    # A hard link costs no I/O, across file systems copyfile() copies in the kernel
+    dst_path.unlink(missing_ok=True)
     try:
-        with Image.open(src_path) as img:
-            img = autorotate_image(img)
-            img.thumbnail((size, size), Image.Resampling.LANCZOS)
-            img.save(dst_path, "WEBP", quality=85, method=6)
-        return True
-    except Exception:
-        # If thumbnail creation fails, copy original file
+        os.link(src_path, dst_path)
+    except OSError:
+        shutil.copyfile(src_path, dst_path)
+
+
+def copy_upload(file_storage: FileStorage, dst_path: pathlib.Path) -> None:
+    """Write an uploaded file to dst_path with a large copy buffer."""
+    # Unbuffered: copyfileobj already hands over full blocks, no need to copy them again
+    with open(dst_path, "wb", buffering=0) as dst:
+        shutil.copyfileobj(file_storage.stream, dst, COPY_BUFFER_SIZE)
+
+
+def drop_page_cache(path: pathlib.Path) -> None:
+    """Tell the kernel the file is not read again soon, so it does not evict hotter pages."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
         try:
-            dst_path.write_bytes(src_path.read_bytes())
-            return True
-        except Exception:
-            return False
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    except OSError:
+        # Only a hint
+        pass
 
 
-def generate_unique_filename(original_filename: str) -> str:
-    """Generate a unique filename with timestamp and random suffix."""
-    secured_name = secure_filename(original_filename or "upload")
-    ext = secured_name.rsplit('.', 1)[-1].lower() if '.' in secured_name else 'jpg'
+def generate_unique_filename(ext: str) -> str:
+    """Generate a unique filename with nanosecond timestamp and random suffix."""
+    # Zero-padded so the names still sort chronologically
+    return f"{time.time_ns():020d}-{secrets.token_hex(4)}.{ext}"
+
+
+def _validate_upload(original_filename: str) -> tuple[Optional[str], str]:
+    """Return (error message or None, extension) so the extension is parsed only once."""
+    allowed, ext = split_allowed_extension(original_filename)
+    if not allowed:
+        return f"Dateityp .{ext or 'unknown'} nicht erlaubt", ext
+    return None, ext
+
+
+def render_thumbnail(file_path: pathlib.Path) -> Optional[str]:
+    """
+    Create the thumbnail for a stored upload.
     
-    timestamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
-    random_suffix = secrets.token_hex(4)
+    Returns:
+        str: name of the thumbnail below THUMB_DIR, or None if it could not be created
+    """
+    try:
+        # Encoded in memory: hashed and written once, no temporary file to read back
+        data = encode_thumbnails(file_path, [_THUMB_SIZE])[0]
+    except Exception:
+        data = None
     
-    return f"{timestamp}-{random_suffix}.{ext}"
+    try:
+        if data is not None:
+            # A short content hash in the name gives every rendering its own URL,
+            # so thumbnails can be cached as immutable. The name is unused until
+            # the caller records it, so writing it in place is safe.
+            digest = hashlib.blake2b(data, digest_size=4).hexdigest()
+            thumb_name = f"{file_path.stem}-{digest}.webp"
+            (_THUMB_DIR / thumb_name).write_bytes(data)
+        else:
+            # The original never changes under its name, a random suffix is just as unique
+            thumb_name = f"{file_path.stem}-{secrets.token_hex(4)}.webp"
+            link_original(file_path, _THUMB_DIR / thumb_name)
+    except OSError:
+        return None
+    
+    # The thumbnail was the last reader of the original, keep it out of the page cache
+    drop_page_cache(file_path)
+    
+    return thumb_name
 
 
 def save_uploaded_file(file_storage: FileStorage, uploader_ip: str) -> tuple[str, Optional[str]]:
     """
-    Save uploaded file and create thumbnail.
+    Save uploaded file; its thumbnail is created later by render_thumbnail.
     
     Returns:
         tuple: (filename, error_message) - error_message is None on success
@@ -84,26 +213,17 @@ def save_uploaded_file(file_storage: FileStorage, uploader_ip: str) -> tuple[str
     original_filename = file_storage.filename
     
     # Validate file type
-    if not is_allowed_file(original_filename):
-        ext = original_filename.rsplit('.', 1)[-1].lower() if '.' in original_filename else "unknown"
-        return "", f"Dateityp .{ext} nicht erlaubt"
+    error, ext = _validate_upload(original_filename)
+    if error:
+        return "", error
     
     # Generate unique filename
-    unique_filename = generate_unique_filename(original_filename)
-    file_path = Config.UPLOAD_DIR / unique_filename
+    unique_filename = generate_unique_filename(ext)
+    file_path = _UPLOAD_DIR / unique_filename
     
     try:
         # Save original file
-        file_storage.save(file_path)
-        
-        # Create thumbnail
-        thumb_path = Config.THUMB_DIR / (file_path.stem + ".webp")
-        if not create_thumbnail(file_path, thumb_path):
-            # If thumbnail creation fails, clean up and return error
-            if file_path.exists():
-                file_path.unlink()
-            return "", f"Fehler beim Erstellen des Vorschaubildes für {original_filename}"
-        
+        copy_upload(file_storage, file_path)
         return unique_filename, None
         
     except Exception as e:
@@ -113,40 +233,81 @@ def save_uploaded_file(file_storage: FileStorage, uploader_ip: str) -> tuple[str
         return "", f"Fehler beim Speichern von {original_filename}"
 
 
-def delete_file_and_thumbnail(filename: str) -> bool:
-    """Delete both the original file and its thumbnail."""
-    success = True
+def save_streamed_file(tmp_path: pathlib.Path, original_filename: str) -> tuple[str, Optional[str]]:
+    """
+    Move a file that was streamed to disk into place; its thumbnail is created later.
     
-    # Delete original file
-    file_path = Config.UPLOAD_DIR / filename
-    if file_path.exists():
-        try:
+    Returns:
+        tuple: (filename, error_message) - error_message is None on success
+    """
+    error, ext = _validate_upload(original_filename)
+    if error:
+        tmp_path.unlink(missing_ok=True)
+        return "", error
+    
+    unique_filename = generate_unique_filename(ext)
+    file_path = _UPLOAD_DIR / unique_filename
+    
+    try:
+        # Same directory, so this is a rename without copying any bytes
+        tmp_path.replace(file_path)
+        return unique_filename, None
+    
+    except Exception:
+        tmp_path.unlink(missing_ok=True)
+        if file_path.exists():
             file_path.unlink()
-        except Exception:
-            success = False
+        return "", f"Fehler beim Speichern von {original_filename}"
+
+
+def default_thumb_name(filename: str) -> str:
+    """Thumbnail name of uploads from before content-hashed names: the file's stem plus .webp."""
+    # String ops instead of pathlib.Path(filename).stem, filenames never contain a directory
+    return (filename.rpartition(".")[0] or filename) + ".webp"
+
+
+def _media_paths(filename: str, thumb: Optional[str] = None) -> tuple[pathlib.Path, pathlib.Path]:
+    """Paths of an upload and its thumbnail (named after the file unless given)."""
+    return (
+        _UPLOAD_DIR / filename,
+        _THUMB_DIR / (thumb or default_thumb_name(filename)),
+    )
+
+
+def delete_file_and_thumbnail(filename: str, thumb: Optional[str] = None) -> bool:
+    """Delete both the original file and its thumbnail (named after the file unless given)."""
+    return delete_many([(filename, thumb)])
+
+
+def delete_many(files: Iterable[tuple[str, Optional[str]]]) -> bool:
+    """
+    Delete the originals and thumbnails of several uploads in one pass.
     
-    # Delete thumbnail
-    thumb_path = Config.THUMB_DIR / (pathlib.Path(filename).stem + ".webp")
-    if thumb_path.exists():
-        try:
-            thumb_path.unlink()
-        except Exception:
-            success = False
+    Args:
+        files: (filename, thumb) pairs; thumb may be None as in delete_file_and_thumbnail
+    
+    Returns:
+        bool: False if any file could not be removed
+    """
+    success = True
+    
+    # One unlink per file instead of exists() + unlink()
+    for filename, thumb in files:
+        for path in _media_paths(filename, thumb):
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                success = False
     
     return success
 
 
 def format_file_size(size_bytes: int) -> str:
     """Format file size in human readable format."""
-    if size_bytes == 0:
+    if size_bytes <= 0:
         return "0 B"
     
-    size_names = ["B", "KB", "MB", "GB"]
-    i = 0
-    size = float(size_bytes)
-    
-    while size >= 1024.0 and i < len(size_names) - 1:
-        size /= 1024.0
-        i += 1
+    # Every unit is 2**10 times the previous one, so the bit length picks it directly
+    i = min((size_bytes.bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
     
-    return f"{size:.1f} {size_names[i]}"
\ No newline at end of file
+    return f"{size_bytes / (1 << (10 * i)):.1f} {_SIZE_UNITS[i]}"
@@ -1,39 +1,93 @@
+import hashlib
 import io
-import qrcode
+from functools import lru_cache
+from typing import Callable, Tuple
+
+import segno
 from flask import make_response, url_for, request
 
 from config import Config
 
 
-def generate_qr_code_response(endpoint: str = 'main.upload') -> any:
-    """Generate QR code for the given endpoint and return Flask response."""
+# Pixels per QR module and quiet zone width in modules
+QR_SCALE = 10
+QR_BORDER = 4
+
+
+def _render_qr(target_url: str, kind: str, **options) -> bytes:
+    """
+    Encode target_url and serialize it with segno's own writer.
+    
+    segno writes bit-packed PNGs and path-based SVGs itself, so neither
+    format goes through Pillow.
+    """
+    # make_qr: never a Micro QR code, which most phone cameras cannot read
+    qr = segno.make_qr(target_url, error="l")
+    buffer = io.BytesIO()
+    qr.save(buffer, kind=kind, scale=QR_SCALE, border=QR_BORDER, **options)
+    return buffer.getvalue()
+
+
+def _render_qr_png(target_url: str) -> bytes:
+    """Render a QR code pointing at target_url as a 1-bit PNG."""
+    return _render_qr(target_url, "png")
+
+
+def _render_qr_svg(target_url: str) -> bytes:
+    """Render a QR code pointing at target_url as SVG."""
+    return _render_qr(target_url, "svg", light="#fff", xmldecl=False, nl=False)
+
+
+# Without PUBLIC_BASE_URL the target follows the client's Host header,
+# so the cache is bounded instead of growing with every host name sent
+@lru_cache(maxsize=8)
+def _cached_qr(fmt: str, render: Callable[[str], bytes], target_url: str) -> Tuple[bytes, str]:
+    """Return (bytes, ETag) of a QR code, rendering it on the first request for target_url."""
+    data = render(target_url)
+    return data, hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def _qr_response(fmt: str, mimetype: str, render: Callable[[str], bytes], endpoint: str):
+    """Build a cacheable QR code response, rendering each target only once."""
     # Determine base URL
     base_url = Config.PUBLIC_BASE_URL.rstrip("/") if Config.PUBLIC_BASE_URL else request.url_root.rstrip("/")
     
     # Generate target URL
     target_url = base_url + url_for(endpoint)
     
-    # Create QR code
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(target_url)
-    qr.make(fit=True)
+    # Render once per target, later requests reuse the bytes
+    data, etag = _cached_qr(fmt, render, target_url)
     
-    # Create image
-    img = qr.make_image(fill_color="black", back_color="white")
+    # Create response
+    response = make_response(data)
+    response.headers["Content-Type"] = mimetype
+    response.headers["Cache-Control"] = "public, max-age=86400, immutable"
+    response.set_etag(etag)
     
-    # Convert to bytes
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    buf.seek(0)
+    return response.make_conditional(request)
+
+
+def generate_qr_code_response(endpoint: str = 'main.upload') -> any:
+    """Generate PNG QR code for the given endpoint and return Flask response."""
+    return _qr_response("png", "image/png", _render_qr_png, endpoint)
+
+
+def generate_qr_svg_response(endpoint: str = 'main.upload') -> any:
+    """Generate SVG QR code for the given endpoint and return Flask response."""
+    return _qr_response("svg", "image/svg+xml", _render_qr_svg, endpoint)
+
+
+def prerender_qr_codes(app, endpoint: str = 'main.upload'):
+    """
+    Render the QR codes at startup when PUBLIC_BASE_URL fixes their target.
     
-    # Create response
-    response = make_response(buf.read())
-    response.headers["Content-Type"] = "image/png"
-    response.headers["Cache-Control"] = "no-store"
+    Requests then only copy cached bytes. Without PUBLIC_BASE_URL the target
+    depends on the request host and is rendered on first use.
+    """
+    if not Config.PUBLIC_BASE_URL:
+        return
     
-    return response
\ No newline at end of file
+    with app.test_request_context():
+        target_url = Config.PUBLIC_BASE_URL.rstrip("/") + url_for(endpoint)
+        _cached_qr("png", _render_qr_png, target_url)
+        _cached_qr("svg", _render_qr_svg, target_url)
@@ -0,0 +1,71 @@
+import gzip
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+
+try:
+    import brotli  # optional, otherwise only .gz siblings are written
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE_SUFFIXES = frozenset({".css", ".js", ".svg"})
+
+# Directories whose contents change the rendered pages
+APP_DIR = Path(__file__).resolve().parent.parent
+BUILD_DIRS = (APP_DIR / "templates", APP_DIR / "static")
+
+
+def precompress_static(static_dir: Path) -> int:
+    """
+    Write .gz (and .br if brotli is installed) siblings next to text assets.
+    
+    The reverse proxy serves these directly with gzip_static/brotli_static.
+    A file is only compressed again when it is newer than its sibling.
+    
+    Returns:
+        int: number of compressed files written
+    """
+    encoders = [(".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encoders.append((".br", lambda data: brotli.compress(data, quality=11)))
+    
+    written = 0
+    for path in Path(static_dir).rglob("*"):
+        if path.suffix not in COMPRESSIBLE_SUFFIXES or not path.is_file():
+            continue
+        
+        mtime = path.stat().st_mtime
+        data = None
+        for suffix, compress in encoders:
+            target = path.with_name(path.name + suffix)
+            if target.exists() and target.stat().st_mtime >= mtime:
+                continue
+            if data is None:
+                data = path.read_bytes()
+            try:
+                target.write_bytes(compress(data))
+            except OSError:
+                # Read-only deployment: the proxy compresses on the fly instead
+                return written
+            written += 1
+    return written
+
+
+@lru_cache(maxsize=None)
+def build_token() -> str:
+    """
+    Hash the templates and static files of this deployment.
+    
+    Part of the page ETags, so a deploy invalidates pages that browsers revalidate.
+    Generated .gz/.br siblings and bytecode caches are skipped.
+    """
+    digest = hashlib.blake2b(digest_size=6)
+    for directory in BUILD_DIRS:
+        for path in sorted(directory.rglob("*")):
+            if (not path.is_file() or "__pycache__" in path.parts
+                    or path.suffix in (".gz", ".br")):
+                continue
+            digest.update(path.relative_to(APP_DIR).as_posix().encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
@@ -0,0 +1,90 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+
+from flask import Flask, current_app
+
+from app.models.database import MediaRepository
+from app.utils.file_utils import render_thumbnail
+from config import Config
+
+
+# Pools are created lazily, per process: a preloading master (gunicorn --preload)
+# must not start threads before it forks, their locks would be copied into the workers
+_pool_lock = threading.Lock()
+
+
+def init_thumb_pool(app: Flask):
+    """
+    Create thumbnails in the background after the upload request returned.
+
+    The pool starts with the first request of every process. Threads are
+    enough: Pillow and libvips release the GIL while decoding, resizing and
+    encoding.
+    """
+    app.before_request(_start_pool)
+
+
+def _start_pool():
+    """Make sure the pool of the current process runs before a request is served."""
+    _get_pool(current_app._get_current_object())
+
+
+def _get_pool(app: Flask) -> ThreadPoolExecutor:
+    """Return the app's pool in the current process, creating it on first use."""
+    pid = os.getpid()
+    entry = app.extensions.get("thumb_pool")
+    if entry is not None and entry[0] == pid:
+        return entry[1]
+    
+    with _pool_lock:
+        entry = app.extensions.get("thumb_pool")
+        if entry is not None and entry[0] == pid:
+            return entry[1]
+        pool = ThreadPoolExecutor(max_workers=Config.THUMB_WORKERS, thread_name_prefix="thumb")
+        app.extensions["thumb_pool"] = (pid, pool)
+    
+    # Jobs do not survive a restart; pick up uploads that are still waiting
+    _submit(app, pool, MediaRepository.get_missing_thumbnails())
+    return pool
+
+
+def schedule_thumbnails(filenames: Iterable[str]):
+    """Queue thumbnail creation for stored uploads that already have a media record."""
+    app = current_app._get_current_object()
+    _submit(app, _get_pool(app), filenames)
+
+
+def _submit(app: Flask, pool: ThreadPoolExecutor, filenames: Iterable[str]):
+    """Queue one thumbnail job per filename."""
+    for filename in filenames:
+        pool.submit(_thumbnail_job, app, filename)
+
+
+def _thumbnail_job(app: Flask, filename: str):
+    """Create one thumbnail and record it, so the gallery swaps the placeholder for it."""
+    with app.app_context():
+        # Every worker process requeues the missing thumbnails, only one renders each
+        if not MediaRepository.claim_thumbnail(filename):
+            return
+        try:
+            _render_and_record(app, filename)
+        finally:
+            MediaRepository.release_thumbnail(filename)
+
+
+def _render_and_record(app: Flask, filename: str):
+    """Render the thumbnail of a claimed record and store its name."""
+    try:
+        thumb = render_thumbnail(Config.UPLOAD_DIR / filename)
+    except Exception:
+        app.logger.exception("Thumbnail for %s failed", filename)
+        return
+    if thumb is None:
+        app.logger.error("Thumbnail for %s could not be created", filename)
+        return
+
+    if not MediaRepository.set_thumb(filename, thumb):
+        # The photo was deleted while its thumbnail was being created
+        (Config.THUMB_DIR / thumb).unlink(missing_ok=True)
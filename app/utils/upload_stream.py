@@ -0,0 +1,86 @@
+import uuid
+from pathlib import Path
+from typing import IO, List, Mapping, NamedTuple, Optional, Tuple
+
+from streaming_form_data import StreamingFormDataParser
+from streaming_form_data.targets import BaseTarget, ValueTarget
+
+from config import Config
+
+
+# Request body read size and write buffer per file: parts of a multi-file upload
+# reach the disk in 1 MiB writes instead of one write per parser callback
+CHUNK_SIZE = 1024 * 1024
+
+
+class StreamedFile(NamedTuple):
+    """An uploaded file that was streamed straight to disk."""
+    filename: str
+    path: Path
+    size: int
+
+
+class MultiFileTarget(BaseTarget):
+    """Target that writes every part of a multi-file field to its own file."""
+
+    def __init__(self, directory: Path):
+        super().__init__()
+        self.directory = directory
+        self.files: List[StreamedFile] = []
+        self._fd = None
+        self._path = None
+        self._size = 0
+
+    def on_start(self):
+        self._path = self.directory / f".upload-{uuid.uuid4().hex}.part"
+        self._fd = open(self._path, "wb", buffering=CHUNK_SIZE)
+        self._size = 0
+
+    def on_data_received(self, chunk: bytes):
+        self._fd.write(chunk)
+        self._size += len(chunk)
+
+    def on_finish(self):
+        self._fd.close()
+        self._fd = None
+        if self.multipart_filename:
+            self.files.append(StreamedFile(self.multipart_filename, self._path, self._size))
+        else:
+            # Empty file input
+            self._path.unlink(missing_ok=True)
+
+    def discard(self):
+        """Remove every file written so far."""
+        if self._fd is not None:
+            self._fd.close()
+            self._path.unlink(missing_ok=True)
+        for streamed in self.files:
+            streamed.path.unlink(missing_ok=True)
+        self.files = []
+
+
+def parse_upload_stream(stream: IO[bytes], headers: Mapping[str, str]) -> Tuple[Optional[str], List[StreamedFile]]:
+    """
+    Parse a multipart upload request without buffering it in Werkzeug.
+
+    Returns:
+        tuple: (upload code or None, files written below UPLOAD_DIR)
+    """
+    parser = StreamingFormDataParser(headers=headers)
+    code_target = ValueTarget()
+    files_target = MultiFileTarget(Config.UPLOAD_DIR)
+    parser.register("code", code_target)
+    parser.register("files", files_target)
+
+    try:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            parser.data_received(chunk)
+    except Exception:
+        files_target.discard()
+        raise
+
+    code = code_target.value.decode("utf-8", "replace") if code_target.value else None
+    return code, files_target.files
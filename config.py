@@ -10,14 +10,34 @@ class Config:
     BASE_DIR = pathlib.Path(__file__).resolve().parent
     
     # Flask configuration
-    SECRET_KEY = os.getenv("FLASK_SECRET", secrets.token_urlsafe(16))
+    # "or" instead of a getenv default: only draw a random key when none is configured
+    SECRET_KEY = os.getenv("FLASK_SECRET") or secrets.token_urlsafe(16)
     MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH_MB", "32")) * 1024 * 1024
     
     # Upload configuration
     UPLOAD_DIR = pathlib.Path(os.getenv("UPLOAD_DIR", BASE_DIR / "uploads"))
     THUMB_DIR = UPLOAD_DIR / "thumbs"
-    ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "gif", "webp"}
+    ALLOWED_EXTENSIONS = frozenset({"jpg", "jpeg", "png", "gif", "webp"})
     THUMB_SIZE = int(os.getenv("THUMB_SIZE", "640"))
+    # libwebp effort 0-6: 6 runs a full search for a few percent smaller files at ~3x the time
+    WEBP_QUALITY = int(os.getenv("WEBP_QUALITY", "82"))
+    WEBP_METHOD = int(os.getenv("WEBP_METHOD", "4"))
+    # Files of one upload request saved in parallel; lower this for threaded WSGI servers
+    UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", str(min(8, os.cpu_count() or 4))))
+    # Threads creating thumbnails in the background, shared by all requests of a worker process
+    THUMB_WORKERS = int(os.getenv("THUMB_WORKERS", str(min(8, os.cpu_count() or 4))))
+    
+    # Gallery configuration
+    GALLERY_PAGE_SIZE = int(os.getenv("GALLERY_PAGE_SIZE", "60"))
+    
+    # Let the reverse proxy send photos: X-Sendfile (Apache mod_xsendfile) or an
+    # nginx internal location aliased to UPLOAD_DIR, e.g. /_internal_uploads/
+    USE_X_SENDFILE = os.getenv("USE_X_SENDFILE", "0") == "1"
+    X_ACCEL_UPLOADS = os.getenv("X_ACCEL_UPLOADS")
+    
+    # Template configuration
+    TEMPLATES_AUTO_RELOAD = False
+    JINJA_CACHE_DIR = pathlib.Path(os.getenv("JINJA_CACHE_DIR", BASE_DIR / ".jinja_cache"))
     
     # Database configuration
     DB_PATH = pathlib.Path(os.getenv("DB_PATH", BASE_DIR / "uploads.db"))
@@ -26,7 +46,7 @@ class Config:
     TITLE = os.getenv("TITLE", "Hochzeitsfotos hochladen")
     PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL")
     UPLOAD_CODE = os.getenv("UPLOAD_CODE")
-    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", secrets.token_urlsafe(16))
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") or secrets.token_urlsafe(16)
     
     # Server configuration
     HOST = os.getenv("HOST", "0.0.0.0")
@@ -38,11 +58,13 @@ class Config:
         """Create necessary directories."""
         cls.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
         cls.THUMB_DIR.mkdir(parents=True, exist_ok=True)
+        cls.JINJA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
 
 class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
+    TEMPLATES_AUTO_RELOAD = True
 
 
 class ProductionConfig(Config):
@@ -19,6 +19,40 @@ from app import create_app
 from config import config
 
 
+def run_gunicorn(app_config):
+    """
+    Replace this process with gunicorn serving the production app.
+    
+    Returns only if gunicorn is not installed.
+    """
+    # Fallback secrets are random per process: fix them before the workers start,
+    # so sessions and the admin token are valid in every worker
+    os.environ.setdefault('FLASK_SECRET', app_config.SECRET_KEY)
+    os.environ.setdefault('ADMIN_TOKEN', app_config.ADMIN_TOKEN)
+    
+    cores = os.cpu_count() or 1
+    workers = 2 * cores + 1
+    # Every worker has its own thumbnail pool and saves uploads with its own
+    # threads: size them per worker so all workers together roughly match the cores
+    os.environ.setdefault('THUMB_WORKERS', str(max(1, cores // workers)))
+    os.environ.setdefault('UPLOAD_WORKERS', '2')
+    try:
+        os.execvp('gunicorn', [
+            'gunicorn',
+            '--workers', str(workers),
+            '--threads', '4',
+            '--worker-class', 'gthread',
+            '--bind', f'{app_config.HOST}:{app_config.PORT}',
+            # Import the app from the project, wherever run.py was started from
+            '--chdir', str(project_root),
+            # Import once in the master, workers share the loaded code copy-on-write
+            '--preload',
+            'app:create_app("production")',
+        ])
+    except FileNotFoundError:
+        print("gunicorn not found, falling back to the Flask development server")
+
+
 def main():
     """Main application entry point."""
     # Determine config name
@@ -27,20 +61,22 @@ def main():
         config_name = sys.argv[1]
     elif os.getenv('FLASK_ENV') == 'production':
         config_name = 'production'
-    
-    # Create and run app
-    app = create_app(config_name)
+    app_config = config[config_name]
     
     # Print admin token for convenience
-    print(f"Admin-Token: {app.config.get('ADMIN_TOKEN', config[config_name].ADMIN_TOKEN)}")
-    print(f"Upload-Code: {app.config.get('UPLOAD_CODE', config[config_name].UPLOAD_CODE) or 'Not set'}")
+    print(f"Admin-Token: {app_config.ADMIN_TOKEN}")
+    print(f"Upload-Code: {app_config.UPLOAD_CODE or 'Not set'}")
     print(f"Running in {config_name} mode")
     
-    # Run the application
+    if config_name == 'production':
+        run_gunicorn(app_config)
+    
+    # Create and run app
+    app = create_app(config_name)
     app.run(
-        host=config[config_name].HOST,
-        port=config[config_name].PORT,
-        debug=config[config_name].DEBUG
+        host=app_config.HOST,
+        port=app_config.PORT,
+        debug=app_config.DEBUG
     )
 
 
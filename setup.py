@@ -11,8 +11,9 @@ setup(
     install_requires=[
         "flask>=3.0.0,<4.0.0",
         "pillow>=10.0.0,<11.0.0",
-        "qrcode[pil]>=7.4.0,<8.0.0",
+        "segno>=1.5.0,<2.0.0",
         "werkzeug>=3.0.0,<4.0.0",
+        "gunicorn>=21.0.0,<22.0.0",
     ],
     extras_require={
         "dev": [
@@ -25,8 +26,11 @@ setup(
             "pytest-flask>=1.2.0",
             "pytest-mock>=3.11.0",
         ],
-        "prod": [
-            "gunicorn>=21.0.0,<22.0.0",
+        "prod": [],
+        "speedups": [
+            "streaming-form-data>=1.13.0,<3.0.0",
+            "orjson>=3.9.0,<4.0.0",
+            "pyvips>=2.2.0,<3.0.0",
         ]
     },
     python_requires=">=3.8",